@@ -57,6 +57,13 @@ class EscobaAPI {
     return await response.json()
   }
 
+  // Pushed match updates: one "state" event with the full view, then a "delta" event per move.
+  // EventSource cannot send headers, so the token travels as a query parameter.
+  static streamMatch(matchId, player, token) {
+    const params = new URLSearchParams({ player, access_token: token })
+    return new EventSource(`${API_BASE}/matches/matches/${matchId}/stream?${params}`)
+  }
+
   // Player endpoints
   static async getPlayerProfile(username) {
     const response = await fetch(`${API_BASE}/players/${username}`)
@@ -69,6 +76,16 @@ class EscobaAPI {
     return await response.json()
   }
 
+  // Batch endpoint: [{ id, method, path, body }] -> one round trip, per-call status codes
+  static async batch(requests, token) {
+    const response = await fetch(`${API_BASE}/batch`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json", Authorization: `Bearer ${token}` },
+      body: JSON.stringify({ requests }),
+    })
+    return await response.json()
+  }
+
   // Cards endpoints
   static async getAllCards() {
     const response = await fetch(`${API_BASE}/cards/cards`)
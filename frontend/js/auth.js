@@ -1,6 +1,7 @@
 class AuthManager {
     constructor() {
         this.currentUser = null;
+        this.token = null;
         this.setupEventListeners();
     }
 
@@ -63,6 +64,7 @@ class AuthManager {
             const result = await EscobaAPI.login(username, password);
             if (result.message === "Login successful" || result.token) {
                 this.currentUser = username;
+                this.token = result.token || null;
                 this.updateUI();
                 this.hideModal();
                 Utils.showNotification(`Welcome ${username}!`, 'success');
@@ -90,6 +92,7 @@ class AuthManager {
 
     logout() {
         this.currentUser = null;
+        this.token = null;
         this.updateUI();
         Utils.showNotification('Goodbye!', 'info');
     }
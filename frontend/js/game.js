@@ -9,6 +9,8 @@ class GameManager {
     this.playerName = null
     this.opponentName = null
     this.gameInterval = null
+    this.gameStream = null
+    this.gameState = null
   }
 
   showCreateGame() {
@@ -137,10 +139,32 @@ class GameManager {
   }
 
   async startGameLoop() {
-    if (this.gameInterval) {
-      clearInterval(this.gameInterval)
+    this.stopGameLoop()
+
+    // Updates are pushed by the server; polling is only the fallback
+    if (window.EventSource && authManager.token) {
+      this.startGameStream()
+    } else {
+      this.startPolling()
     }
+  }
 
+  startGameStream() {
+    const stream = EscobaAPI.streamMatch(this.currentMatch, this.playerName, authManager.token)
+    this.gameStream = stream
+
+    stream.addEventListener("state", (event) => this.applyGameState(JSON.parse(event.data)))
+    stream.addEventListener("delta", (event) => this.applyGameState({ ...this.gameState, ...JSON.parse(event.data) }))
+    stream.onerror = () => {
+      // EventSource reconnects by itself; CLOSED means the server refused the stream
+      if (stream.readyState === EventSource.CLOSED && this.gameStream === stream) {
+        this.gameStream = null
+        this.startPolling()
+      }
+    }
+  }
+
+  async startPolling() {
     this.gameInterval = setInterval(() => {
       this.updateGameState()
     }, 3000)
@@ -148,22 +172,38 @@ class GameManager {
     await this.updateGameState()
   }
 
+  stopGameLoop() {
+    if (this.gameInterval) {
+      clearInterval(this.gameInterval)
+      this.gameInterval = null
+    }
+    if (this.gameStream) {
+      this.gameStream.close()
+      this.gameStream = null
+    }
+  }
+
   async updateGameState() {
     if (!this.currentMatch || !this.playerName) return
 
     try {
       const state = await EscobaAPI.getMatchState(this.currentMatch, this.playerName)
-      this.renderGameState(state)
-
-      if (state.status === "finished") {
-        clearInterval(this.gameInterval)
-        this.showGameResult(state)
-      }
+      this.applyGameState(state)
     } catch (error) {
       console.error("Error updating game state:", error)
     }
   }
 
+  applyGameState(state) {
+    this.gameState = state
+    this.renderGameState(state)
+
+    if (state.status === "finished") {
+      this.stopGameLoop()
+      this.showGameResult(state)
+    }
+  }
+
   renderGameState(state) {
     const gameState = document.getElementById("gameState")
 
@@ -251,7 +291,9 @@ class GameManager {
   async playCard(cardId) {
     if (!this.currentMatch || !this.playerName) return
 
-    const currentState = await EscobaAPI.getMatchState(this.currentMatch, this.playerName)
+    const currentState = this.gameStream && this.gameState
+      ? this.gameState
+      : await EscobaAPI.getMatchState(this.currentMatch, this.playerName)
     if (currentState.current_player !== this.playerName) {
       Utils.showNotification("It's not your turn!", "error")
       return
@@ -261,7 +303,10 @@ class GameManager {
       Utils.showNotification("Playing card...", "info")
       const result = await EscobaAPI.playCard(this.currentMatch, this.playerName, cardId)
 
-      await this.updateGameState()
+      // A stream delivers the new state by itself
+      if (!this.gameStream) {
+        await this.updateGameState()
+      }
 
       if (result.message) {
         Utils.showNotification(result.message, "success")
@@ -273,10 +318,8 @@ class GameManager {
   }
 
   leaveGame() {
-    if (this.gameInterval) {
-      clearInterval(this.gameInterval)
-      this.gameInterval = null
-    }
+    this.stopGameLoop()
+    this.gameState = null
     this.currentMatch = null
     this.playerName = null
     this.opponentName = null
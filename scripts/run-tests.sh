@@ -13,6 +13,14 @@ print_status() {
     echo -e "${2}${1}${NC}"
 }
 
+# Unit tests need no services (match-service rules and scoring)
+print_status "🧪 Running unit tests..." "$YELLOW"
+if python -m pytest -q test/unit; then
+    print_status "✅ Unit tests passed" "$GREEN"
+else
+    print_status "❌ Unit tests failed" "$RED"
+fi
+
 # Check if Docker is running
 if ! docker info > /dev/null 2>&1; then
     print_status "❌ Docker is not running. Please start Docker first." "$RED"
@@ -65,6 +73,7 @@ if [ -d "test/integration" ]; then
     docker exec ase-project-api-gateway-1 mkdir -p /app/test/integration 2>/dev/null || true
     docker cp test/integration/test_api_gateway.py ase-project-api-gateway-1:/app/test/integration/
     docker cp test/integration/test_end_to_end.py ase-project-api-gateway-1:/app/test/integration/
+    docker cp test/integration/test_player_stats_concurrency.py ase-project-api-gateway-1:/app/test/integration/
     
     # Install requests in the container
     print_status "📦 Installing dependencies..." "$YELLOW"
@@ -85,6 +94,14 @@ if [ -d "test/integration" ]; then
     else
         print_status "❌ End-to-end tests failed" "$RED"
     fi
+    
+    # Run player stats concurrency test inside container
+    print_status "🚀 Running player stats concurrency test..." "$YELLOW"
+    if docker exec ase-project-api-gateway-1 python /app/test/integration/test_player_stats_concurrency.py; then
+        print_status "✅ Player stats concurrency test passed" "$GREEN"
+    else
+        print_status "❌ Player stats concurrency test failed" "$RED"
+    fi
 else
     print_status "ℹ️ Integration tests directory not found, skipping." "$YELLOW"
 fi
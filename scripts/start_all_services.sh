@@ -2,6 +2,9 @@
 
 echo "Starting La Escoba Microservices..."
 
+# auth, player and history import the shared connection pool (services/shared/db_pool.py)
+export PYTHONPATH="$(pwd)/services/shared${PYTHONPATH:+:$PYTHONPATH}"
+
 python services/auth-service/app.py &
 AUTH_PID=$!
 echo "Auth Service started (PID: $AUTH_PID) on port 5001"
@@ -1,43 +1,160 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
 import os
 from flask_cors import CORS
 import jwt
+import hashlib
+import threading
+import time
+import json
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from werkzeug.exceptions import HTTPException
 
 app = Flask(__name__)
 CORS(app)
 
 # Service URLs
-AUTH_SERVICE_URL = "http://auth-service:5001"
-CARDS_SERVICE_URL = "http://cards-service:5002"
-MATCH_SERVICE_URL = "http://match-service:5003"
-PLAYER_SERVICE_URL = "http://player-service:5004"
-HISTORY_SERVICE_URL = "http://history-service:5005"
+AUTH_SERVICE_URL = os.environ.get('AUTH_SERVICE_URL', "http://auth-service:5001")
+CARDS_SERVICE_URL = os.environ.get('CARDS_SERVICE_URL', "http://cards-service:5002")
+MATCH_SERVICE_URL = os.environ.get('MATCH_SERVICE_URL', "http://match-service:5003")
+PLAYER_SERVICE_URL = os.environ.get('PLAYER_SERVICE_URL', "http://player-service:5004")
+HISTORY_SERVICE_URL = os.environ.get('HISTORY_SERVICE_URL', "http://history-service:5005")
+
+# Upstream connection pool defaults (overridable per service, e.g. CARDS_SERVICE_POOL_SIZE)
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 20))
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 2))
+UPSTREAM_READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 10))
+UPSTREAM_RETRIES = int(os.environ.get('UPSTREAM_RETRIES', 1))
+
+# Load shedding and circuit breaking defaults (also overridable per service)
+UPSTREAM_MAX_CONCURRENCY = int(os.environ.get('UPSTREAM_MAX_CONCURRENCY', 30))
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', 5))
+BREAKER_RESET_TIMEOUT = float(os.environ.get('BREAKER_RESET_TIMEOUT', 30))
+BREAKER_HALF_OPEN_PROBES = int(os.environ.get('BREAKER_HALF_OPEN_PROBES', 1))
+
+# Hop-by-hop headers must not be forwarded, otherwise a client "Connection: close"
+# would tear down the pooled keep-alive connection to the upstream
+HOP_BY_HOP_HEADERS = {
+    'host', 'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailers', 'transfer-encoding', 'upgrade', 'content-length'
+}
 
 # JWT Secret
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-super-secret-jwt-key-change-in-production-2025')
 
+# Routes reachable without a Bearer token (not /metrics: it exposes pool, breaker and cache internals)
+PUBLIC_PATHS = ['/health', '/auth/register', '/auth/login', '/cards/cards']
+
+# Server-sent event routes: proxied unbuffered, and since EventSource cannot set
+# headers they also accept the token as ?access_token=
+STREAMING_ENDPOINTS = {'match_stream'}
+STREAM_TOKEN_PARAM = 'access_token'
+# Upstream streams send a heartbeat well within this
+STREAM_READ_TIMEOUT = float(os.environ.get('STREAM_READ_TIMEOUT', 60))
+
+# Verified-token cache
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+# Upper bound for tokens issued without an exp claim
+TOKEN_CACHE_MAX_TTL = int(os.environ.get('TOKEN_CACHE_MAX_TTL', 300))
+
+class TokenCache:
+    """Bounded LRU of verified tokens: sha256(token) -> (username, exp)"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.verified = 0
+        self.verify_seconds = 0.0
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] <= time.time():
+                # Evict at exp so the next decode reports the token as expired
+                del self.entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, username, exp, verify_seconds):
+        with self.lock:
+            self.verified += 1
+            self.verify_seconds += verify_seconds
+            self.entries[key] = (username, exp)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            avg_verify = self.verify_seconds / self.verified if self.verified else 0.0
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired_evictions": self.expired,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "avg_verify_ms": round(avg_verify * 1000, 4),
+                "time_saved_ms": round(self.hits * avg_verify * 1000, 2),
+            }
+
+TOKEN_CACHE = TokenCache(TOKEN_CACHE_SIZE)
+
 def validate_token(token):
+    key = TokenCache.key(token)
+    username = TOKEN_CACHE.get(key)
+    if username is not None:
+        return {"valid": True, "username": username}
+
+    started = time.perf_counter()
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-        return {"valid": True, "username": payload['username']}
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
         return {"valid": False, "error": "Invalid or expired token"}
+    exp = min(payload.get('exp', float('inf')), time.time() + TOKEN_CACHE_MAX_TTL)
+    TOKEN_CACHE.put(key, payload['username'], exp, time.perf_counter() - started)
+    return {"valid": True, "username": payload['username']}
+
+def authenticate(auth_header):
+    """Validate a raw Authorization header value"""
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return {"valid": False, "error": "Authorization header required"}
+    return validate_token(auth_header.split(' ')[1])
 
 def requires_auth(f):
     from functools import wraps
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if request.path in ['/health', '/auth/register', '/auth/login', '/cards/cards']:
+        if request.path in PUBLIC_PATHS:
             return f(*args, **kwargs)
         
         auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({"error": "Authorization header required"}), 401
-        
-        token = auth_header.split(' ')[1]
-        validation = validate_token(token)
+        if not auth_header and request.endpoint in STREAMING_ENDPOINTS and request.args.get(STREAM_TOKEN_PARAM):
+            auth_header = f"Bearer {request.args[STREAM_TOKEN_PARAM]}"
+        validation = authenticate(auth_header)
         if not validation['valid']:
             return jsonify({"error": validation['error']}), 401
         
@@ -50,99 +167,631 @@ def requires_auth(f):
 def before_request():
     pass
 
+def upstream_config(name):
+    """Pool size, timeouts and retry budget for one upstream service"""
+    prefix = f"{name.upper()}_SERVICE_"
+    return {
+        "name": name,
+        "pool_size": int(os.environ.get(prefix + 'POOL_SIZE', UPSTREAM_POOL_SIZE)),
+        "connect_timeout": float(os.environ.get(prefix + 'CONNECT_TIMEOUT', UPSTREAM_CONNECT_TIMEOUT)),
+        "read_timeout": float(os.environ.get(prefix + 'READ_TIMEOUT', UPSTREAM_READ_TIMEOUT)),
+        "retries": int(os.environ.get(prefix + 'RETRIES', UPSTREAM_RETRIES)),
+        "max_concurrency": int(os.environ.get(prefix + 'MAX_CONCURRENCY', UPSTREAM_MAX_CONCURRENCY)),
+        "failure_threshold": int(os.environ.get(prefix + 'FAILURE_THRESHOLD', BREAKER_FAILURE_THRESHOLD)),
+        "reset_timeout": float(os.environ.get(prefix + 'RESET_TIMEOUT', BREAKER_RESET_TIMEOUT)),
+    }
+
+UPSTREAMS = {
+    AUTH_SERVICE_URL: upstream_config('auth'),
+    CARDS_SERVICE_URL: upstream_config('cards'),
+    MATCH_SERVICE_URL: upstream_config('match'),
+    PLAYER_SERVICE_URL: upstream_config('player'),
+    HISTORY_SERVICE_URL: upstream_config('history'),
+}
+
+class ConnectCountingMixin:
+    """Calls on_connect after every TCP connect, including urllib3 reopening a pooled
+    connection object whose socket the upstream closed (e.g. "Connection: close")"""
+
+    on_connect = None
+
+    def connect(self):
+        super().connect()
+        if self.on_connect is not None:
+            self.on_connect()
+
+class CountingHTTPConnection(ConnectCountingMixin, HTTPConnection):
+    pass
+
+class CountingHTTPSConnection(ConnectCountingMixin, HTTPSConnection):
+    pass
+
+class TCPConnectCounterMixin:
+    """Pool that counts real socket connects; num_connections only counts connection objects"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tcp_connects = 0
+        self.tcp_connects_lock = threading.Lock()
+
+    def _new_conn(self):
+        conn = super()._new_conn()
+        conn.on_connect = self.count_tcp_connect
+        return conn
+
+    def count_tcp_connect(self):
+        with self.tcp_connects_lock:
+            self.tcp_connects += 1
+
+class CountingHTTPConnectionPool(TCPConnectCounterMixin, HTTPConnectionPool):
+    ConnectionCls = CountingHTTPConnection
+
+class CountingHTTPSConnectionPool(TCPConnectCounterMixin, HTTPSConnectionPool):
+    ConnectionCls = CountingHTTPSConnection
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools report real TCP connects (read by upstream_pool_stats)"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
+
+def create_upstream_session(service_url, config):
+    """One keep-alive session per upstream; retries only cover idempotent methods"""
+    session = requests.Session()
+    retry = Retry(
+        total=config['retries'],
+        connect=config['retries'],
+        read=config['retries'],
+        status=0,
+        backoff_factor=0.05,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+    )
+    adapter = CountingHTTPAdapter(pool_connections=1, pool_maxsize=config['pool_size'], max_retries=retry)
+    session.mount(service_url, adapter)
+    return session
+
+UPSTREAM_SESSIONS = {url: create_upstream_session(url, config) for url, config in UPSTREAMS.items()}
+
+def upstream_pool_stats(service_url):
+    """Connection reuse counters from the urllib3 pool behind a service session"""
+    adapter = UPSTREAM_SESSIONS[service_url].get_adapter(service_url)
+    pool = adapter.poolmanager.connection_from_url(service_url)
+    # num_requests counts every request sent; a request that had to open a socket is a miss
+    misses = pool.tcp_connects
+    hits = max(pool.num_requests - misses, 0)
+    total = hits + misses
+    return {
+        "pool_size": UPSTREAMS[service_url]['pool_size'],
+        "requests": pool.num_requests,
+        "pool_hits": hits,
+        "pool_misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+        # The pool queue is pre-filled with None placeholders for unopened slots
+        "idle_connections": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0,
+    }
+
+# --- CIRCUIT BREAKERS & BULKHEADS ---
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling an upstream whose breaker is open or whose bulkhead is full"""
+
+    def __init__(self, service, reason, retry_after):
+        super().__init__(f"{service} service unavailable: {reason}")
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half_open after reset_timeout -> closed on a good probe"""
+
+    def __init__(self, name, failure_threshold, reset_timeout, half_open_probes=BREAKER_HALF_OPEN_PROBES):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def retry_after(self):
+        return max(int(self.opened_at + self.reset_timeout - time.time()), 1)
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'open':
+                if time.time() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = 'half_open'
+                self.probes = 0
+            if self.state == 'half_open':
+                if self.probes >= self.half_open_probes:
+                    self.rejected += 1
+                    return False
+                self.probes += 1
+            return True
+
+    def record(self, success):
+        with self.lock:
+            if success:
+                self.state = 'closed'
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.time()
+
+    def stats(self):
+        with self.lock:
+            return {"state": self.state, "consecutive_failures": self.failures, "rejected": self.rejected}
+
+class Bulkhead:
+    """Non-blocking concurrency limit: callers beyond the limit are shed instead of queued"""
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.shed = 0
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        with self.lock:
+            if self.in_flight >= self.max_concurrency:
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self.lock:
+            return {"in_flight": self.in_flight, "max_concurrency": self.max_concurrency, "shed": self.shed}
+
+UPSTREAM_BREAKERS = {
+    url: CircuitBreaker(config['name'], config['failure_threshold'], config['reset_timeout'])
+    for url, config in UPSTREAMS.items()
+}
+UPSTREAM_BULKHEADS = {url: Bulkhead(config['max_concurrency']) for url, config in UPSTREAMS.items()}
+
+class UpstreamCall:
+    """Guards one upstream call; set failed for responses that should count against the breaker
+
+    bulkheads defaults to the Flask mode's; the async gateway passes its own, sized for its larger pools.
+    """
+
+    def __init__(self, service_url, bulkheads=None):
+        self.service_url = service_url
+        self.bulkhead = (bulkheads or UPSTREAM_BULKHEADS)[service_url]
+        self.failed = False
+
+    def __enter__(self):
+        name = UPSTREAMS[self.service_url]['name']
+        breaker = UPSTREAM_BREAKERS[self.service_url]
+        if not self.bulkhead.try_acquire():
+            raise UpstreamUnavailable(name, "too many concurrent requests", 1)
+        if not breaker.allow():
+            self.bulkhead.release()
+            raise UpstreamUnavailable(name, "circuit open", breaker.retry_after())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.bulkhead.release()
+        UPSTREAM_BREAKERS[self.service_url].record(exc_type is None and not self.failed)
+        return False
+
+def upstream_health(bulkheads=None):
+    bulkheads = bulkheads or UPSTREAM_BULKHEADS
+    return {
+        config['name']: {**UPSTREAM_BREAKERS[url].stats(), **bulkheads[url].stats()}
+        for url, config in UPSTREAMS.items()
+    }
+
+def unavailable_response(error):
+    response = jsonify({"error": str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def send_upstream(service_url, path, method, headers=None, params=None, json=None, data=None):
+    """Send one request over the pooled session of an upstream service"""
+    config = UPSTREAMS[service_url]
+    with UpstreamCall(service_url) as call:
+        response = UPSTREAM_SESSIONS[service_url].request(
+            method=method,
+            url=f"{service_url}/{path}",
+            headers={k: v for k, v in (headers or {}).items() if k.lower() not in HOP_BY_HOP_HEADERS},
+            params=params,
+            json=json,
+            data=data,
+            timeout=(config['connect_timeout'], config['read_timeout']),
+        )
+        # Application errors (4xx, 500) mean the service answered; gateway-level 5xx mean it did not
+        call.failed = response.status_code in (502, 503, 504)
+    return response
+
 def forward_request(service_url, path, method):
     try:
-        url = f"{service_url}/{path}"
-        request_args = {
-            'method': method,
-            'url': url,
-            'headers': {k: v for k, v in request.headers.items() if k != 'Host'},
-        }
+        request_args = {'headers': dict(request.headers), 'params': request.args}
         if method in ['POST', 'PUT', 'PATCH']:
             if request.is_json:
                 request_args['json'] = request.get_json()
             else:
                 request_args['data'] = request.get_data()
         
-        response = requests.request(**request_args)
+        response = send_upstream(service_url, path, method, **request_args)
+        content_type = response.headers.get('Content-Type', '')
+        if content_type and 'json' not in content_type and not content_type.startswith('text/'):
+            # Binary payloads (e.g. packed decks) are passed through untouched
+            return Response(response.content, response.status_code, content_type=content_type)
         try:
             return response.json(), response.status_code
         except:
             return response.text, response.status_code
+    except UpstreamUnavailable as e:
+        return unavailable_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# --- STREAMING ---
+
+# Streams live for minutes, so they get their own session instead of pinning keep-alive pool slots
+STREAM_SESSION = requests.Session()
+STREAM_COUNTERS = {"open": 0, "opened": 0}
+STREAM_COUNTERS_LOCK = threading.Lock()
+
+def count_stream(key, delta=1):
+    with STREAM_COUNTERS_LOCK:
+        STREAM_COUNTERS[key] += delta
+
+def stream_request(service_url, path):
+    """Relay an upstream text/event-stream chunk by chunk; breaker and bulkhead only guard the connect"""
+    config = UPSTREAMS[service_url]
+    params = {k: v for k, v in request.args.items() if k != STREAM_TOKEN_PARAM}
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+    try:
+        with UpstreamCall(service_url) as call:
+            upstream = STREAM_SESSION.get(f"{service_url}/{path}", headers=headers, params=params, stream=True,
+                                          timeout=(config['connect_timeout'], STREAM_READ_TIMEOUT))
+            call.failed = upstream.status_code in (502, 503, 504)
+    except UpstreamUnavailable as e:
+        return unavailable_response(e)
+    except requests.RequestException as e:
+        return jsonify({"error": str(e)}), 500
+
+    if upstream.status_code != 200:
+        try:
+            return upstream.json(), upstream.status_code
+        except ValueError:
+            return upstream.text, upstream.status_code
+        finally:
+            upstream.close()
+
+    def relay():
+        count_stream("open")
+        count_stream("opened")
+        try:
+            for chunk in upstream.iter_content(chunk_size=None):
+                yield chunk
+        except requests.RequestException:
+            pass
+        finally:
+            count_stream("open", -1)
+            upstream.close()
+
+    return Response(stream_with_context(relay()), upstream.status_code, content_type=upstream.headers.get('Content-Type'),
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# --- RESPONSE CACHE ---
+
+# Per-route TTLs (seconds) for responses that never change between deploys
+RESPONSE_CACHE_TTLS = {
+    'cards_all': int(os.environ.get('CARDS_CACHE_TTL', 300)),
+    'cards_specific': int(os.environ.get('CARD_CACHE_TTL', 3600)),
+}
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 4 * 1024 * 1024))
+
+# Client validators are answered by the gateway, the upstream always gets an unconditional GET
+CONDITIONAL_HEADERS = {'if-none-match', 'if-modified-since'}
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'content_type', 'etag', 'last_modified', 'expires_at'])
+
+class ResponseCache:
+    """Size-bounded LRU of pre-serialized upstream responses with their validators"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires_at <= time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, content_type, ttl, etag=None, last_modified=None):
+        if not etag:
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        entry = CachedResponse(body, content_type, etag, last_modified or formatdate(usegmt=True), time.time() + ttl)
+        if len(body) > self.max_bytes:
+            return entry
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = entry
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+        return entry
+
+    def _remove(self, key):
+        self.size -= len(self.entries.pop(key).body)
+
+    def is_not_modified(self, entry, if_none_match, if_modified_since):
+        """RFC 7232: If-None-Match wins over If-Modified-Since when both are sent"""
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            matched = '*' in tags or entry.etag in tags or f"W/{entry.etag}" in tags
+        elif if_modified_since:
+            try:
+                matched = parsedate_to_datetime(if_modified_since) >= parsedate_to_datetime(entry.last_modified)
+            except (TypeError, ValueError):
+                matched = False
+        else:
+            matched = False
+        if matched:
+            with self.lock:
+                self.not_modified += 1
+        return matched
+
+    def headers(self, entry, cache_status):
+        return {
+            'ETag': entry.etag,
+            'Last-Modified': entry.last_modified,
+            'Cache-Control': f"public, max-age={max(int(entry.expires_at - time.time()), 0)}",
+            'X-Cache': cache_status,
+        }
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+RESPONSE_CACHE = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+
+def cached_forward_request(service_url, path, ttl):
+    key = request.full_path
+    entry = RESPONSE_CACHE.get(key)
+    cache_status = 'HIT'
+    if entry is None:
+        cache_status = 'MISS'
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in CONDITIONAL_HEADERS}
+        try:
+            response = send_upstream(service_url, path, 'GET', headers=headers, params=request.args)
+        except UpstreamUnavailable as e:
+            return unavailable_response(e)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        if response.status_code != 200:
+            return Response(response.content, response.status_code, content_type=response.headers.get('Content-Type'))
+        entry = RESPONSE_CACHE.put(key, response.content, response.headers.get('Content-Type'), ttl,
+                                   response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    headers = RESPONSE_CACHE.headers(entry, cache_status)
+    if RESPONSE_CACHE.is_not_modified(entry, request.headers.get('If-None-Match'), request.headers.get('If-Modified-Since')):
+        return Response(status=304, headers=headers)
+    return Response(entry.body, 200, headers=headers, content_type=entry.content_type)
+
 # --- ROUTES ---
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({"status": "API Gateway running", "timestamp": datetime.now().isoformat()})
+    upstreams = upstream_health()
+    degraded = [name for name, state in upstreams.items() if state['state'] != 'closed']
+    return jsonify({
+        "status": "API Gateway running",
+        "degraded_upstreams": degraded,
+        "upstreams": upstreams,
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({
+        "upstreams": {config['name']: upstream_pool_stats(url) for url, config in UPSTREAMS.items()},
+        "token_cache": TOKEN_CACHE.stats(),
+        "response_cache": RESPONSE_CACHE.stats(),
+        "streams": dict(STREAM_COUNTERS),
+        "timestamp": datetime.now().isoformat()
+    })
+
+# (rule, method, endpoint, upstream service, upstream path template)
+# Shared with the asyncio gateway in asgi_app.py so both modes serve the same API
+ROUTES = [
+    # Auth
+    ('/auth/register', 'POST', 'auth_register', AUTH_SERVICE_URL, 'register'),
+    ('/auth/login', 'POST', 'auth_login', AUTH_SERVICE_URL, 'login'),
+    ('/auth/logout', 'POST', 'auth_logout', AUTH_SERVICE_URL, 'logout'),
+    ('/auth/health', 'GET', 'auth_health', AUTH_SERVICE_URL, 'health'),
 
-# Auth
-@app.route('/auth/register', methods=['POST'])
-def auth_register(): return forward_request(AUTH_SERVICE_URL, "register", "POST")
+    # Cards
+    ('/cards/cards', 'GET', 'cards_all', CARDS_SERVICE_URL, 'cards'),
+    ('/cards/cards/<card_id>', 'GET', 'cards_specific', CARDS_SERVICE_URL, 'cards/{card_id}'),
+    ('/cards/decks', 'POST', 'cards_decks', CARDS_SERVICE_URL, 'cards/decks'),
+    ('/cards/health', 'GET', 'cards_health', CARDS_SERVICE_URL, 'health'),
 
-@app.route('/auth/login', methods=['POST'])
-def auth_login(): return forward_request(AUTH_SERVICE_URL, "login", "POST")
+    # Matches (Plurale esterno -> Singolare interno)
+    ('/matches/matches', 'POST', 'match_create', MATCH_SERVICE_URL, 'match'),
+    ('/matches/matches', 'GET', 'match_list', MATCH_SERVICE_URL, 'match'),
+    ('/matches/matches/<match_id>', 'GET', 'match_get', MATCH_SERVICE_URL, 'match/{match_id}'),
+    ('/matches/matches/<match_id>/play', 'POST', 'match_play', MATCH_SERVICE_URL, 'match/{match_id}/play'),
+    ('/matches/matches/<match_id>/stream', 'GET', 'match_stream', MATCH_SERVICE_URL, 'match/{match_id}/stream'),
+    ('/matches/health', 'GET', 'match_health', MATCH_SERVICE_URL, 'health'),
+    ('/matches/matchmaking', 'POST', 'matchmaking_join', MATCH_SERVICE_URL, 'matchmaking'),
+    ('/matches/matchmaking/<player>', 'GET', 'matchmaking_status', MATCH_SERVICE_URL, 'matchmaking/{player}'),
+    ('/matches/matchmaking/<player>', 'DELETE', 'matchmaking_leave', MATCH_SERVICE_URL, 'matchmaking/{player}'),
 
-@app.route('/auth/logout', methods=['POST'])
-def auth_logout(): return forward_request(AUTH_SERVICE_URL, "logout", "POST")
+    # Players
+    ('/players/<username>', 'GET', 'players_get', PLAYER_SERVICE_URL, 'players/{username}'),
+    ('/players', 'GET', 'players_list', PLAYER_SERVICE_URL, 'players'),
+    ('/players/health', 'GET', 'players_health', PLAYER_SERVICE_URL, 'health'),
 
-@app.route('/auth/health', methods=['GET'])
-def auth_health(): return forward_request(AUTH_SERVICE_URL, "health", "GET")
+    # History (CORRETTO: Ora punta a /matches plurale)
+    ('/history/<username>', 'GET', 'history_get', HISTORY_SERVICE_URL, 'history/{username}'),
+    ('/history/stats/<username>', 'GET', 'history_stats', HISTORY_SERVICE_URL, 'stats/{username}'),
+    ('/history/matches', 'POST', 'history_save', HISTORY_SERVICE_URL, 'history/matches'),
+    ('/history/matches/<match_id>', 'GET', 'history_match_details', HISTORY_SERVICE_URL, 'history/matches/{match_id}'),
+    ('/history/health', 'GET', 'history_health', HISTORY_SERVICE_URL, 'health'),
+]
 
-# Cards
-@app.route('/cards/cards', methods=['GET'])
-def cards_all(): return forward_request(CARDS_SERVICE_URL, "cards", "GET")
+def make_proxy_view(endpoint, service_url, upstream_path, method):
+    if endpoint in STREAMING_ENDPOINTS:
+        def stream_view(**path_args):
+            return stream_request(service_url, upstream_path.format(**path_args))
+        return stream_view
 
-@app.route('/cards/cards/<card_id>', methods=['GET'])
-def cards_specific(card_id): return forward_request(CARDS_SERVICE_URL, f"cards/{card_id}", "GET")
+    if endpoint in RESPONSE_CACHE_TTLS:
+        ttl = RESPONSE_CACHE_TTLS[endpoint]
+        def cached_view(**path_args):
+            return cached_forward_request(service_url, upstream_path.format(**path_args), ttl)
+        return cached_view
 
-@app.route('/cards/health', methods=['GET'])
-def cards_health(): return forward_request(CARDS_SERVICE_URL, "health", "GET")
+    def view(**path_args):
+        return forward_request(service_url, upstream_path.format(**path_args), method)
+    return view
 
-# Matches (Plurale esterno -> Singolare interno)
-@app.route('/matches/matches', methods=['POST'])
-def match_create(): return forward_request(MATCH_SERVICE_URL, "match", "POST")
+for rule, method, endpoint, service_url, upstream_path in ROUTES:
+    app.add_url_rule(rule, endpoint, make_proxy_view(endpoint, service_url, upstream_path, method), methods=[method])
 
-@app.route('/matches/matches', methods=['GET'])
-def match_list(): return forward_request(MATCH_SERVICE_URL, "match", "GET")
+# --- BATCH ---
 
-@app.route('/matches/matches/<match_id>', methods=['GET'])
-def match_get(match_id): return forward_request(MATCH_SERVICE_URL, f"match/{match_id}", "GET")
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 32))
+BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
 
-@app.route('/matches/matches/<match_id>/play', methods=['POST'])
-def match_play(match_id): return forward_request(MATCH_SERVICE_URL, f"match/{match_id}/play", "POST")
+ROUTE_TARGETS = {endpoint: (service_url, upstream_path) for _, _, endpoint, service_url, upstream_path in ROUTES}
 
-@app.route('/matches/health', methods=['GET'])
-def match_health(): return forward_request(MATCH_SERVICE_URL, "health", "GET")
+# Sub-requests carry the caller's headers (Authorization included) but not the outer body framing
+BATCH_DROPPED_HEADERS = {'content-type', 'content-length'} | CONDITIONAL_HEADERS
 
-# Players
-@app.route('/players/<username>', methods=['GET'])
-def players_get(username): return forward_request(PLAYER_SERVICE_URL, f"players/{username}", "GET")
+def parse_batch(data):
+    """Validate a /batch body: {"requests": [{"id", "method", "path", "body"}, ...]}"""
+    if not isinstance(data, dict) or not isinstance(data.get('requests'), list):
+        return None, "Body must be a JSON object with a 'requests' list"
+    if not data['requests']:
+        return None, "At least one sub-request is required"
+    if len(data['requests']) > BATCH_MAX_REQUESTS:
+        return None, f"At most {BATCH_MAX_REQUESTS} sub-requests per batch"
 
-@app.route('/players', methods=['GET'])
-def players_list(): return forward_request(PLAYER_SERVICE_URL, "players", "GET")
+    subrequests = []
+    for index, sub in enumerate(data['requests']):
+        if not isinstance(sub, dict) or not isinstance(sub.get('path'), str):
+            return None, f"requests[{index}] must be an object with a 'path'"
+        path, _, query = sub['path'].partition('?')
+        subrequests.append({
+            "id": sub.get('id', index),
+            "method": str(sub.get('method', 'GET')).upper(),
+            "path": path,
+            "query": query,
+            "body": sub.get('body'),
+        })
+    return subrequests, None
 
-@app.route('/players/health', methods=['GET'])
-def players_health(): return forward_request(PLAYER_SERVICE_URL, "health", "GET")
+def resolve_route(method, path):
+    """Map a gateway path to (endpoint, upstream service, upstream path) using the Flask route table"""
+    try:
+        endpoint, path_args = app.url_map.bind('gateway').match(path, method)
+    except HTTPException as e:
+        return None, e.code
+    if endpoint not in ROUTE_TARGETS or endpoint in STREAMING_ENDPOINTS:
+        # /health, /metrics and /batch itself are not proxied routes, streams never end
+        return None, 404
+    service_url, upstream_path = ROUTE_TARGETS[endpoint]
+    return (endpoint, service_url, upstream_path.format(**path_args)), None
+
+def decode_body(content, content_type):
+    if content_type and 'json' in content_type:
+        try:
+            return json.loads(content)
+        except ValueError:
+            pass
+    return content.decode('utf-8', errors='replace')
 
-# History (CORRETTO: Ora punta a /matches plurale)
-@app.route('/history/<username>', methods=['GET'])
-def history_get(username): return forward_request(HISTORY_SERVICE_URL, f"history/{username}", "GET")
+def dispatch_subrequest(sub, headers):
+    target, error_status = resolve_route(sub['method'], sub['path'])
+    if target is None:
+        return {"id": sub['id'], "status": error_status, "body": {"error": "No such route"}}
+    endpoint, service_url, path = target
 
-@app.route('/history/stats/<username>', methods=['GET'])
-def history_stats(username): return forward_request(HISTORY_SERVICE_URL, f"stats/{username}", "GET")
+    ttl = RESPONSE_CACHE_TTLS.get(endpoint)
+    cache_key = f"{sub['path']}?{sub['query']}"
+    if ttl:
+        entry = RESPONSE_CACHE.get(cache_key)
+        if entry is not None:
+            return {"id": sub['id'], "status": 200, "body": decode_body(entry.body, entry.content_type)}
+
+    try:
+        response = send_upstream(
+            service_url, path, sub['method'], headers=headers, params=sub['query'] or None,
+            json=sub['body'] if sub['method'] in ['POST', 'PUT', 'PATCH'] else None,
+        )
+    except UpstreamUnavailable as e:
+        return {"id": sub['id'], "status": 503, "body": {"error": str(e)}}
+    except Exception as e:
+        return {"id": sub['id'], "status": 500, "body": {"error": str(e)}}
 
-# FIX QUI SOTTO: history/matches (plurale)
-@app.route('/history/matches', methods=['POST'])
-def history_save(): return forward_request(HISTORY_SERVICE_URL, "history/matches", "POST")
+    content_type = response.headers.get('Content-Type')
+    if ttl and response.status_code == 200:
+        RESPONSE_CACHE.put(cache_key, response.content, content_type, ttl,
+                           response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return {"id": sub['id'], "status": response.status_code, "body": decode_body(response.content, content_type)}
 
-@app.route('/history/matches/<match_id>', methods=['GET'])
-def history_match_details(match_id): return forward_request(HISTORY_SERVICE_URL, f"history/matches/{match_id}", "GET")
+@app.route('/batch', methods=['POST'])
+def batch():
+    """Run several gateway calls concurrently behind a single authentication"""
+    subrequests, error = parse_batch(request.get_json(silent=True))
+    if error:
+        return jsonify({"error": error}), 400
 
-@app.route('/history/health', methods=['GET'])
-def history_health(): return forward_request(HISTORY_SERVICE_URL, "health", "GET")
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in BATCH_DROPPED_HEADERS}
+    responses = list(BATCH_EXECUTOR.map(lambda sub: dispatch_subrequest(sub, headers), subrequests))
+    return jsonify({"count": len(responses), "responses": responses})
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    if os.environ.get('GATEWAY_MODE', 'flask') == 'async':
+        import uvicorn
+        uvicorn.run('asgi_app:app', host='0.0.0.0', port=5000, log_level='warning')
+    else:
+        app.run(host='0.0.0.0', port=5000, debug=False)
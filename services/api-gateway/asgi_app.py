@@ -0,0 +1,330 @@
+"""Asyncio gateway mode.
+
+Serves the same ROUTES table as the Flask gateway in app.py, but proxies with a
+non-blocking httpx client so one process can hold thousands of in-flight
+upstream calls. Start with GATEWAY_MODE=async python app.py, or directly with
+uvicorn asgi_app:app --port 5000.
+"""
+import asyncio
+import os
+from datetime import datetime
+from urllib.parse import parse_qsl
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Match, Route
+
+from app import (
+    ROUTES, UPSTREAMS, HOP_BY_HOP_HEADERS, PUBLIC_PATHS, TOKEN_CACHE, authenticate,
+    RESPONSE_CACHE, RESPONSE_CACHE_TTLS, CONDITIONAL_HEADERS,
+    Bulkhead, UpstreamCall, UpstreamUnavailable, upstream_health,
+    BATCH_DROPPED_HEADERS, parse_batch, resolve_route, decode_body,
+    STREAMING_ENDPOINTS, STREAM_TOKEN_PARAM, STREAM_READ_TIMEOUT,
+)
+
+# Async mode is not bound by worker threads, so it can keep more upstream connections open
+ASYNC_UPSTREAM_POOL_SIZE = int(os.environ.get('ASYNC_UPSTREAM_POOL_SIZE', 100))
+# Calls beyond the pool size wait in httpx for a free connection; only past this many in flight are they shed.
+# Never below the pool size (the Flask mode's UPSTREAM_MAX_CONCURRENCY would cap async mode at 30).
+ASYNC_UPSTREAM_MAX_CONCURRENCY = max(int(os.environ.get('ASYNC_UPSTREAM_MAX_CONCURRENCY', 2000)),
+                                     ASYNC_UPSTREAM_POOL_SIZE)
+
+def async_max_concurrency(config):
+    """Per-service override, e.g. CARDS_SERVICE_ASYNC_MAX_CONCURRENCY"""
+    limit = os.environ.get(f"{config['name'].upper()}_SERVICE_ASYNC_MAX_CONCURRENCY", ASYNC_UPSTREAM_MAX_CONCURRENCY)
+    return max(int(limit), ASYNC_UPSTREAM_POOL_SIZE)
+
+ASYNC_UPSTREAM_BULKHEADS = {url: Bulkhead(async_max_concurrency(config)) for url, config in UPSTREAMS.items()}
+
+UPSTREAM_CLIENTS = {}
+UPSTREAM_TRANSPORTS = {}
+UPSTREAM_COUNTERS = {url: {"in_flight": 0, "errors": 0} for url in UPSTREAMS}
+STREAM_COUNTERS = {"open": 0, "opened": 0}
+
+class CountingTransport(httpx.AsyncHTTPTransport):
+    """Counts requests and real TCP connects, like app.CountingHTTPAdapter does for the urllib3 pools"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = 0
+        self.connections = 0
+
+    async def trace(self, event_name, info):
+        # httpcore only connects when no idle keep-alive connection was available
+        if event_name == 'connection.connect_tcp.complete':
+            self.connections += 1
+
+    async def handle_async_request(self, request):
+        self.requests += 1
+        request.extensions = {**request.extensions, 'trace': self.trace}
+        return await super().handle_async_request(request)
+
+def create_upstream_client(service_url, config):
+    """Keep-alive client per upstream, honouring the same timeouts and retry budget as the Flask mode"""
+    transport = CountingTransport(
+        limits=httpx.Limits(
+            max_connections=ASYNC_UPSTREAM_POOL_SIZE,
+            max_keepalive_connections=ASYNC_UPSTREAM_POOL_SIZE,
+        ),
+        retries=config['retries'],
+    )
+    UPSTREAM_TRANSPORTS[service_url] = transport
+    return httpx.AsyncClient(
+        base_url=service_url,
+        transport=transport,
+        timeout=httpx.Timeout(config['read_timeout'], connect=config['connect_timeout']),
+    )
+
+def upstream_pool_stats(service_url):
+    """Same keys and meaning as app.upstream_pool_stats: a miss is a request that opened a TCP connection"""
+    transport = UPSTREAM_TRANSPORTS[service_url]
+    misses = transport.connections
+    hits = max(transport.requests - misses, 0)
+    total = hits + misses
+    return {
+        "pool_size": ASYNC_UPSTREAM_POOL_SIZE,
+        "requests": transport.requests,
+        "pool_hits": hits,
+        "pool_misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+        "idle_connections": sum(1 for conn in transport._pool.connections if conn.is_idle()),
+    }
+
+def unavailable_response(error):
+    return JSONResponse({"error": str(error)}, status_code=503, headers={'Retry-After': str(error.retry_after)})
+
+async def send_upstream(service_url, method, path, **kwargs):
+    """Async counterpart of app.send_upstream, sharing its breakers (the bulkheads are async mode's own)"""
+    with UpstreamCall(service_url, ASYNC_UPSTREAM_BULKHEADS) as call:
+        response = await UPSTREAM_CLIENTS[service_url].request(method, f"/{path}", **kwargs)
+        call.failed = response.status_code in (502, 503, 504)
+    return response
+
+async def forward_request(service_url, path, request):
+    counters = UPSTREAM_COUNTERS[service_url]
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+    body = await request.body() if request.method in ['POST', 'PUT', 'PATCH'] else None
+
+    counters['in_flight'] += 1
+    try:
+        response = await send_upstream(
+            service_url, request.method, path, headers=headers, params=request.query_params, content=body
+        )
+    except UpstreamUnavailable as e:
+        return unavailable_response(e)
+    except httpx.HTTPError as e:
+        counters['errors'] += 1
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        counters['in_flight'] -= 1
+
+    return Response(response.content, status_code=response.status_code,
+                    media_type=response.headers.get('content-type'))
+
+async def cached_forward_request(service_url, path, request, ttl):
+    key = f"{request.url.path}?{request.url.query}"
+    entry = RESPONSE_CACHE.get(key)
+    cache_status = 'HIT'
+    if entry is None:
+        cache_status = 'MISS'
+        headers = {k: v for k, v in request.headers.items()
+                   if k.lower() not in HOP_BY_HOP_HEADERS and k.lower() not in CONDITIONAL_HEADERS}
+        try:
+            response = await send_upstream(service_url, 'GET', path, headers=headers, params=request.query_params)
+        except UpstreamUnavailable as e:
+            return unavailable_response(e)
+        except httpx.HTTPError as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+        if response.status_code != 200:
+            return Response(response.content, status_code=response.status_code,
+                            media_type=response.headers.get('content-type'))
+        entry = RESPONSE_CACHE.put(key, response.content, response.headers.get('content-type'), ttl,
+                                   response.headers.get('etag'), response.headers.get('last-modified'))
+
+    headers = RESPONSE_CACHE.headers(entry, cache_status)
+    if RESPONSE_CACHE.is_not_modified(entry, request.headers.get('if-none-match'), request.headers.get('if-modified-since')):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, status_code=200, headers=headers, media_type=entry.content_type)
+
+async def stream_request(service_url, path, request):
+    """Async counterpart of app.stream_request"""
+    config = UPSTREAMS[service_url]
+    client = UPSTREAM_CLIENTS[service_url]
+    params = {k: v for k, v in request.query_params.items() if k != STREAM_TOKEN_PARAM}
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+    upstream_request = client.build_request('GET', f"/{path}", params=params, headers=headers,
+                                            timeout=httpx.Timeout(STREAM_READ_TIMEOUT, connect=config['connect_timeout']))
+    try:
+        with UpstreamCall(service_url, ASYNC_UPSTREAM_BULKHEADS) as call:
+            upstream = await client.send(upstream_request, stream=True)
+            call.failed = upstream.status_code in (502, 503, 504)
+    except UpstreamUnavailable as e:
+        return unavailable_response(e)
+    except httpx.HTTPError as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+    if upstream.status_code != 200:
+        content = await upstream.aread()
+        await upstream.aclose()
+        return Response(content, status_code=upstream.status_code, media_type=upstream.headers.get('content-type'))
+
+    async def relay():
+        STREAM_COUNTERS['open'] += 1
+        STREAM_COUNTERS['opened'] += 1
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        except httpx.HTTPError:
+            pass
+        finally:
+            STREAM_COUNTERS['open'] -= 1
+
+    # content-type is copied as is: media_type would append a second charset
+    return StreamingResponse(relay(), status_code=200,
+                             headers={'Content-Type': upstream.headers.get('content-type', 'text/event-stream'),
+                                      'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+                             background=BackgroundTask(upstream.aclose))
+
+def make_proxy_endpoint(endpoint_name, service_url, upstream_path):
+    if endpoint_name in STREAMING_ENDPOINTS:
+        async def stream_endpoint(request):
+            return await stream_request(service_url, upstream_path.format(**request.path_params), request)
+        return stream_endpoint
+
+    if endpoint_name in RESPONSE_CACHE_TTLS:
+        ttl = RESPONSE_CACHE_TTLS[endpoint_name]
+        async def cached_endpoint(request):
+            return await cached_forward_request(service_url, upstream_path.format(**request.path_params), request, ttl)
+        return cached_endpoint
+
+    async def endpoint(request):
+        return await forward_request(service_url, upstream_path.format(**request.path_params), request)
+    return endpoint
+
+def stream_routes():
+    """Path matchers for the streaming routes, which also take the token from the query string"""
+    return [Route(rule.replace('<', '{').replace('>', '}'), lambda request: None, methods=[method])
+            for rule, method, endpoint, _, _ in ROUTES if endpoint in STREAMING_ENDPOINTS]
+
+STREAM_ROUTES = stream_routes()
+
+def is_stream_route(scope):
+    return any(route.matches(scope)[0] == Match.FULL for route in STREAM_ROUTES)
+
+class AuthMiddleware:
+    """ASGI counterpart of requires_auth in app.py"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] not in PUBLIC_PATHS:
+            auth_header = dict(scope['headers']).get(b'authorization', b'').decode('latin-1')
+            if not auth_header and is_stream_route(scope):
+                token = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1'))).get(STREAM_TOKEN_PARAM)
+                auth_header = f"Bearer {token}" if token else ''
+            validation = authenticate(auth_header)
+            if not validation['valid']:
+                response = JSONResponse({"error": validation['error']}, status_code=401)
+                await response(scope, receive, send)
+                return
+            scope.setdefault('state', {})['username'] = validation['username']
+        await self.app(scope, receive, send)
+
+async def dispatch_subrequest(sub, headers):
+    target, error_status = resolve_route(sub['method'], sub['path'])
+    if target is None:
+        return {"id": sub['id'], "status": error_status, "body": {"error": "No such route"}}
+    endpoint, service_url, path = target
+
+    ttl = RESPONSE_CACHE_TTLS.get(endpoint)
+    cache_key = f"{sub['path']}?{sub['query']}"
+    if ttl:
+        entry = RESPONSE_CACHE.get(cache_key)
+        if entry is not None:
+            return {"id": sub['id'], "status": 200, "body": decode_body(entry.body, entry.content_type)}
+
+    try:
+        response = await send_upstream(
+            service_url, sub['method'], path, headers=headers, params=sub['query'] or None,
+            json=sub['body'] if sub['method'] in ['POST', 'PUT', 'PATCH'] else None,
+        )
+    except UpstreamUnavailable as e:
+        return {"id": sub['id'], "status": 503, "body": {"error": str(e)}}
+    except httpx.HTTPError as e:
+        return {"id": sub['id'], "status": 500, "body": {"error": str(e)}}
+
+    content_type = response.headers.get('content-type')
+    if ttl and response.status_code == 200:
+        RESPONSE_CACHE.put(cache_key, response.content, content_type, ttl,
+                           response.headers.get('etag'), response.headers.get('last-modified'))
+    return {"id": sub['id'], "status": response.status_code, "body": decode_body(response.content, content_type)}
+
+async def batch(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    subrequests, error = parse_batch(data)
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+
+    headers = {k: v for k, v in request.headers.items()
+               if k.lower() not in HOP_BY_HOP_HEADERS and k.lower() not in BATCH_DROPPED_HEADERS}
+    responses = await asyncio.gather(*(dispatch_subrequest(sub, headers) for sub in subrequests))
+    return JSONResponse({"count": len(responses), "responses": list(responses)})
+
+async def health(request):
+    upstreams = upstream_health(ASYNC_UPSTREAM_BULKHEADS)
+    return JSONResponse({
+        "status": "API Gateway running",
+        "mode": "async",
+        "degraded_upstreams": [name for name, state in upstreams.items() if state['state'] != 'closed'],
+        "upstreams": upstreams,
+        "timestamp": datetime.now().isoformat()
+    })
+
+async def metrics(request):
+    return JSONResponse({
+        "mode": "async",
+        "upstreams": {UPSTREAMS[url]['name']: {**upstream_pool_stats(url), **counters}
+                      for url, counters in UPSTREAM_COUNTERS.items()},
+        "token_cache": TOKEN_CACHE.stats(),
+        "response_cache": RESPONSE_CACHE.stats(),
+        "streams": dict(STREAM_COUNTERS),
+        "timestamp": datetime.now().isoformat()
+    })
+
+def build_routes():
+    routes = [
+        Route('/health', health, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/batch', batch, methods=['POST']),
+    ]
+    # Starlette matches in order, so static paths go before parameterised ones (werkzeug does this by itself)
+    for rule, method, endpoint, service_url, upstream_path in sorted(ROUTES, key=lambda r: '<' in r[0]):
+        path = rule.replace('<', '{').replace('>', '}')
+        routes.append(Route(path, make_proxy_endpoint(endpoint, service_url, upstream_path), methods=[method], name=endpoint))
+    return routes
+
+async def startup():
+    for url, config in UPSTREAMS.items():
+        UPSTREAM_CLIENTS[url] = create_upstream_client(url, config)
+
+async def shutdown():
+    for client in UPSTREAM_CLIENTS.values():
+        await client.aclose()
+
+app = Starlette(
+    routes=build_routes(),
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+        Middleware(AuthMiddleware),
+    ],
+    on_startup=[startup],
+    on_shutdown=[shutdown],
+)
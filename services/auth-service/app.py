@@ -1,10 +1,12 @@
 from flask import Flask, request, jsonify
+from waitress import serve
 from datetime import datetime, timedelta
 import jwt
 import uuid
 import requests
 import bcrypt
 import psycopg2
+from db_pool import ConnectionPool
 import os
 import time
 from flask_cors import CORS
@@ -39,21 +41,28 @@ def wait_for_db(max_retries=30, retry_interval=2):
                 print(f"❌ Failed to connect to database after {max_retries} attempts: {e}")
                 return False
 
+# Pooled connections (db_pool.py): conn.close() hands the connection back to the pool
+DB_POOL = ConnectionPool(
+    minconn=int(os.environ.get('DB_POOL_MIN', 2)),
+    maxconn=int(os.environ.get('DB_POOL_MAX', 20)),
+    checkout_timeout=float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+    host=os.environ.get('DB_HOST', 'auth-db'),
+    database=os.environ.get('DB_NAME', 'auth_db'),
+    user=os.environ.get('DB_USER', 'user'),
+    password=os.environ.get('DB_PASSWORD', 'password'),
+    port=os.environ.get('DB_PORT', '5432')
+)
+DB_POOL.init_app(app)
+
 def get_db_connection():
-    conn = psycopg2.connect(
-        host=os.environ.get('DB_HOST', 'auth-db'),
-        database=os.environ.get('DB_NAME', 'auth_db'),
-        user=os.environ.get('DB_USER', 'user'),
-        password=os.environ.get('DB_PASSWORD', 'password'),
-        port=os.environ.get('DB_PORT', '5432')
-    )
-    return conn
+    return DB_POOL.getconn()
 
 def init_db():
     """Initialize database tables"""
     if not wait_for_db():
         print("❌ Cannot initialize database - connection failed")
         return False
+    DB_POOL.fill()
         
     conn = get_db_connection()
     cur = conn.cursor()
@@ -109,6 +118,9 @@ def validate_input(data):
         errors.append("Username must be less than 50 characters")
     elif not re.match(r'^[a-zA-Z0-9_]+$', username):
         errors.append("Username can only contain letters, numbers and underscores")
+    elif username.lower().startswith('bot_'):
+        # Reserved for match-service computer opponents (bot_easy, bot_medium, ...)
+        errors.append("Usernames starting with bot_ are reserved")
     
     # Validate password - SEMPLIFICATA PER TESTING
     password = data.get('password', '')
@@ -425,6 +437,7 @@ def health():
         return jsonify({
             "status": "Auth service is running", 
             "database": "connected",
+            "database_pool": DB_POOL.stats(),
             "users_count": users_count,
             "timestamp": datetime.now().isoformat(),
             "security": "bcrypt+jwt+validation"
@@ -433,6 +446,7 @@ def health():
         return jsonify({
             "status": "Auth service is running", 
             "database": "disconnected", 
+            "database_pool": DB_POOL.stats(),
             "error": str(e)
         }), 503
 
@@ -444,6 +458,8 @@ if __name__ == '__main__':
         print("✅ Auth service starting on port 5001...")
         print("🔒 Security features: bcrypt, JWT, input validation")
         print("📧 Email handling: NULL allowed for empty emails")
-        app.run(host='0.0.0.0', port=5001, debug=False)
+        # waitress instead of app.run(): the Werkzeug dev server closes every connection,
+        # which defeats the gateway's keep-alive pool to this service
+        serve(app, host='0.0.0.0', port=5001, threads=int(os.environ.get('WSGI_THREADS', 16)))
     else:
         print("❌ Failed to initialize database, service cannot start")
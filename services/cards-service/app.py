@@ -1,6 +1,15 @@
-from flask import Flask, jsonify
+from flask import Flask, Response, request, jsonify
+from waitress import serve
 from flask_cors import CORS
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+import base64
+import hashlib
+import json
 import os
+import random
+
+import numpy as np
 
 app = Flask(__name__)
 CORS(app)
@@ -56,61 +65,171 @@ SPANISH_DECK = [
     {"id": 40, "name": "Rey de Bastos", "suit": "Bastos", "value": 12, "points": 10, "image": "rey_bastos.png", "suit_order": 1}
 ]
 
+VALID_SUITS = ['Oros', 'Copas', 'Espadas', 'Bastos']
+
+SUITS_INFO = {
+    "Oros": {
+        "name": "Oros",
+        "translation": "Coins",
+        "suit_order": 4,
+        "card_count": 10,
+        "description": "Gold coins, highest ranking suit"
+    },
+    "Copas": {
+        "name": "Copas", 
+        "translation": "Cups",
+        "suit_order": 3,
+        "card_count": 10,
+        "description": "Chalices or cups"
+    },
+    "Espadas": {
+        "name": "Espadas",
+        "translation": "Swords", 
+        "suit_order": 2,
+        "card_count": 10,
+        "description": "Swords"
+    },
+    "Bastos": {
+        "name": "Bastos",
+        "translation": "Clubs",
+        "suit_order": 1, 
+        "card_count": 10,
+        "description": "Clubs or cudgels, lowest ranking suit"
+    }
+}
+
+# --- INDEXES (built once at startup, the deck never changes) ---
+
+CARDS_BY_ID = {card['id']: card for card in SPANISH_DECK}
+
+# Canonical listing order: suit_order, then value
+SORTED_DECK = sorted(SPANISH_DECK, key=lambda x: (x['suit_order'], x['value']))
+
+CARDS_BY_SUIT = {suit: [card for card in SORTED_DECK if card['suit'] == suit] for suit in VALID_SUITS}
+
+CARDS_BY_VALUE = {}
+for card in SORTED_DECK:
+    CARDS_BY_VALUE.setdefault(card['value'], []).append(card)
+
+# Per-suit value arrays for bisect range lookups (CARDS_BY_SUIT lists are already value-sorted)
+SUIT_VALUES = {suit: [card['value'] for card in cards] for suit, cards in CARDS_BY_SUIT.items()}
+SUITS_IN_ORDER = sorted(VALID_SUITS, key=lambda suit: SUITS_INFO[suit]['suit_order'])
+
+def cards_in_range(suit, min_value, max_value):
+    """Cards of one suit (or all suits when None) with min_value <= value <= max_value, in listing order"""
+    suits = [suit] if suit else SUITS_IN_ORDER
+    result = []
+    for suit_name in suits:
+        values = SUIT_VALUES[suit_name]
+        lo = bisect_left(values, min_value) if min_value is not None else 0
+        hi = bisect_right(values, max_value) if max_value is not None else len(values)
+        result.extend(CARDS_BY_SUIT[suit_name][lo:hi])
+    return result
+
+# --- PRE-SERIALIZED PAYLOADS ---
+
+CACHE_MAX_AGE = int(os.environ.get('CARDS_CACHE_MAX_AGE', 3600))
+
+def render(payload):
+    """Canonical JSON bytes plus a strong ETag derived from them"""
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return body, '"%s"' % hashlib.sha1(body).hexdigest()
+
+def payload_response(rendered):
+    body, etag = rendered
+    headers = {'ETag': etag, 'Cache-Control': f'public, max-age={CACHE_MAX_AGE}'}
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype='application/json', headers=headers)
+
+def cards_listing(cards):
+    suits_count = {}
+    for card in cards:
+        suits_count[card['suit']] = suits_count.get(card['suit'], 0) + 1
+    return {
+        "count": len(cards),
+        "total_cards": 40,
+        "suits_distribution": suits_count,
+        "cards": cards
+    }
+
+@lru_cache(maxsize=None)
+def rendered_listing(suit, min_value, max_value):
+    """Arguments are normalised by the caller, so the key space is finite (5 x 13 x 13)"""
+    return render(cards_listing(cards_in_range(suit, min_value, max_value)))
+
+RENDERED_CARDS = {card_id: render(card) for card_id, card in CARDS_BY_ID.items()}
+
+RENDERED_SUITS = {
+    suit: render({"suit": suit, "card_count": len(cards), "cards": cards})
+    for suit, cards in CARDS_BY_SUIT.items()
+}
+
+RENDERED_VALUES = {
+    value: render({"value": value, "card_count": len(cards), "cards": cards})
+    for value, cards in CARDS_BY_VALUE.items()
+}
+
+RENDERED_SUITS_INFO = render({
+    "suits": SUITS_INFO,
+    "total_suits": 4
+})
+
+# Deck (id) order, as the endpoint has always listed them
+REYES_CARDS = [card for card in SPANISH_DECK if card['points'] == 10]
+
+RENDERED_SPECIAL = render({
+    "special_cards": {
+        "seven_of_oros": {
+            "card": CARDS_BY_ID[7],
+            "bonus": "1 extra point in scoring",
+            "description": "The most valuable card in the game"
+        },
+        "seven_of_copas": {
+            "card": CARDS_BY_ID[17], 
+            "bonus": "1 extra point in scoring",
+            "description": "Second most valuable card"
+        }
+    },
+    "reyes_cards": {
+        "count": len(REYES_CARDS),
+        "cards": REYES_CARDS,
+        "description": "Kings (Reyes) worth 10 points each"
+    }
+})
+
+# Warm the unfiltered listings, the most requested payloads
+rendered_listing(None, None, None)
+for suit_name in VALID_SUITS:
+    rendered_listing(suit_name, None, None)
+
 def get_card_by_id(card_id):
     """Get card by ID with validation"""
     try:
-        card_id = int(card_id)
-        if 1 <= card_id <= 40:
-            return next((card for card in SPANISH_DECK if card['id'] == card_id), None)
-        return None
+        return CARDS_BY_ID.get(int(card_id))
     except (ValueError, TypeError):
         return None
 
+def parse_value_bound(raw):
+    """Query value bound clamped to the deck's 1..12 range; invalid values are ignored"""
+    if not raw:
+        return None
+    try:
+        return min(max(int(raw), 0), 13)
+    except ValueError:
+        return None
+
 @app.route('/cards', methods=['GET'])
 def get_all_cards():
     """Get all Spanish deck cards with filtering options"""
     try:
-        # Get query parameters for filtering
         suit = request.args.get('suit')
-        min_value = request.args.get('min_value')
-        max_value = request.args.get('max_value')
-        
-        filtered_cards = SPANISH_DECK.copy()
-        
-        # Filter by suit if provided
-        if suit and suit in ['Oros', 'Copas', 'Espadas', 'Bastos']:
-            filtered_cards = [card for card in filtered_cards if card['suit'] == suit]
-        
-        # Filter by value range if provided
-        if min_value:
-            try:
-                min_val = int(min_value)
-                filtered_cards = [card for card in filtered_cards if card['value'] >= min_val]
-            except ValueError:
-                pass
-        
-        if max_value:
-            try:
-                max_val = int(max_value)
-                filtered_cards = [card for card in filtered_cards if card['value'] <= max_val]
-            except ValueError:
-                pass
-        
-        # Sort by suit order and value
-        filtered_cards.sort(key=lambda x: (x['suit_order'], x['value']))
-        
-        # Calculate statistics
-        suits_count = {}
-        for card in filtered_cards:
-            suit_name = card['suit']
-            suits_count[suit_name] = suits_count.get(suit_name, 0) + 1
-        
-        return jsonify({
-            "count": len(filtered_cards),
-            "total_cards": 40,
-            "suits_distribution": suits_count,
-            "cards": filtered_cards
-        })
+        if suit not in CARDS_BY_SUIT:
+            suit = None
+        min_value = parse_value_bound(request.args.get('min_value'))
+        max_value = parse_value_bound(request.args.get('max_value'))
+        return payload_response(rendered_listing(suit, min_value, max_value))
     except Exception as e:
         return jsonify({"error": f"Failed to get cards: {str(e)}"}), 500
 
@@ -120,96 +239,34 @@ def get_card(card_id):
     card = get_card_by_id(card_id)
 
     if card:
-        return jsonify(card)
+        return payload_response(RENDERED_CARDS[card['id']])
     else:
         return jsonify({"error": "Card not found"}), 404
 
 @app.route('/cards/suits', methods=['GET'])
 def get_suits():
     """Get information about all suits"""
-    suits_info = {
-        "Oros": {
-            "name": "Oros",
-            "translation": "Coins",
-            "suit_order": 4,
-            "card_count": 10,
-            "description": "Gold coins, highest ranking suit"
-        },
-        "Copas": {
-            "name": "Copas", 
-            "translation": "Cups",
-            "suit_order": 3,
-            "card_count": 10,
-            "description": "Chalices or cups"
-        },
-        "Espadas": {
-            "name": "Espadas",
-            "translation": "Swords", 
-            "suit_order": 2,
-            "card_count": 10,
-            "description": "Swords"
-        },
-        "Bastos": {
-            "name": "Bastos",
-            "translation": "Clubs",
-            "suit_order": 1, 
-            "card_count": 10,
-            "description": "Clubs or cudgels, lowest ranking suit"
-        }
-    }
-    
-    return jsonify({
-        "suits": suits_info,
-        "total_suits": 4
-    })
+    return payload_response(RENDERED_SUITS_INFO)
 
 @app.route('/cards/suits/<suit_name>', methods=['GET'])
 def get_suit_cards(suit_name):
     """Get all cards of a specific suit"""
-    valid_suits = ['Oros', 'Copas', 'Espadas', 'Bastos']
-    
-    if suit_name not in valid_suits:
+    if suit_name not in RENDERED_SUITS:
         return jsonify({"error": "Invalid suit name"}), 400
     
-    suit_cards = [card for card in SPANISH_DECK if card['suit'] == suit_name]
-    suit_cards.sort(key=lambda x: x['value'])
-    
-    return jsonify({
-        "suit": suit_name,
-        "card_count": len(suit_cards),
-        "cards": suit_cards
-    })
+    return payload_response(RENDERED_SUITS[suit_name])
+
+@app.route('/cards/values/<int:value>', methods=['GET'])
+def get_value_cards(value):
+    """Get all cards with a given face value, one per suit"""
+    if value not in RENDERED_VALUES:
+        return jsonify({"error": "Invalid card value"}), 400
+    return payload_response(RENDERED_VALUES[value])
 
 @app.route('/cards/special', methods=['GET'])
 def get_special_cards():
     """Get special cards that give extra points in La Escoba"""
-    special_cards = {
-        "seven_of_oros": next(card for card in SPANISH_DECK if card['id'] == 7),
-        "seven_of_copas": next(card for card in SPANISH_DECK if card['id'] == 17)
-    }
-    
-    # Get all cards worth 10 points (Reyes)
-    reyes_cards = [card for card in SPANISH_DECK if card['points'] == 10]
-    
-    return jsonify({
-        "special_cards": {
-            "seven_of_oros": {
-                "card": special_cards["seven_of_oros"],
-                "bonus": "1 extra point in scoring",
-                "description": "The most valuable card in the game"
-            },
-            "seven_of_copas": {
-                "card": special_cards["seven_of_copas"], 
-                "bonus": "1 extra point in scoring",
-                "description": "Second most valuable card"
-            }
-        },
-        "reyes_cards": {
-            "count": len(reyes_cards),
-            "cards": reyes_cards,
-            "description": "Kings (Reyes) worth 10 points each"
-        }
-    })
+    return payload_response(RENDERED_SPECIAL)
 
 @app.route('/cards/deck', methods=['POST'])
 def create_shuffled_deck():
@@ -217,14 +274,14 @@ def create_shuffled_deck():
     try:
         deck = list(range(1, 41))  # Card IDs from 1 to 40
         
-        # Optional: specify seed for reproducible shuffling
-        seed = request.json.get('seed') if request.json else None
-        if seed:
-            import random
-            random.seed(seed)
-        
-        import random
-        random.shuffle(deck)
+        # Optional: specify seed for reproducible shuffling.
+        # A private generator keeps concurrent seeded requests from sharing global RNG state.
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Body must be a JSON object"}), 400
+        seed = data.get('seed')
+        rng = random.Random(seed) if seed else random.Random()
+        rng.shuffle(deck)
         
         return jsonify({
             "deck": deck,
@@ -234,6 +291,79 @@ def create_shuffled_deck():
     except Exception as e:
         return jsonify({"error": f"Failed to create deck: {str(e)}"}), 500
 
+# --- BULK DECKS ---
+
+BULK_DECKS_MAX = int(os.environ.get('BULK_DECKS_MAX', 100000))
+BULK_DECKS_JSON_MAX = int(os.environ.get('BULK_DECKS_JSON_MAX', 1000))
+DECK_SIZE = 40
+# Philox is counter based: one counter step yields four 64-bit words, and a deck consumes
+# one double per card, so deck i owns counter steps [i * 10, (i + 1) * 10)
+PHILOX_STEPS_PER_DECK = DECK_SIZE // 4
+
+def normalise_seed(seed):
+    """Philox key from an int or string seed; a fresh random key when no seed is given"""
+    if seed is None or seed == '':
+        return np.random.SeedSequence().entropy % (1 << 64)
+    if isinstance(seed, bool) or not isinstance(seed, (int, str)):
+        raise ValueError("seed must be an integer or a string")
+    if isinstance(seed, int):
+        return seed % (1 << 128)
+    return int.from_bytes(hashlib.sha256(seed.encode('utf-8')).digest()[:16], 'big')
+
+def generate_decks(key, count, offset=0):
+    """count x 40 uint8 card ids; deck i depends only on (key, offset + i), never on count"""
+    bit_generator = np.random.Philox(key=key)
+    bit_generator.advance(offset * PHILOX_STEPS_PER_DECK)
+    sort_keys = np.random.Generator(bit_generator).random((count, DECK_SIZE))
+    # Batched permutation: argsort of i.i.d. uniforms is a uniform shuffle per row
+    return (np.argsort(sort_keys, axis=1) + 1).astype(np.uint8)
+
+@app.route('/cards/decks', methods=['POST'])
+def create_shuffled_decks():
+    """Create many shuffled decks in one call (tournaments, simulations)
+
+    Body: {"count": N, "seed": int|str, "offset": K, "format": "binary"|"base64"|"json"}
+    binary returns count * 40 bytes, one byte per card id, deck after deck.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Body must be a JSON object"}), 400
+    try:
+        count = int(data.get('count', 1))
+        offset = int(data.get('offset', 0))
+        key = normalise_seed(data.get('seed'))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid bulk deck request: {str(e)}"}), 400
+
+    output_format = data.get('format', 'binary')
+    if output_format not in ['binary', 'base64', 'json']:
+        return jsonify({"error": "format must be 'binary', 'base64' or 'json'"}), 400
+    if count < 1 or count > BULK_DECKS_MAX:
+        return jsonify({"error": f"count must be between 1 and {BULK_DECKS_MAX}"}), 400
+    if output_format == 'json' and count > BULK_DECKS_JSON_MAX:
+        return jsonify({"error": f"json format is limited to {BULK_DECKS_JSON_MAX} decks, use binary"}), 400
+    if offset < 0:
+        return jsonify({"error": "offset must be >= 0"}), 400
+
+    decks = generate_decks(key, count, offset)
+    # Unseeded requests report the generated key so the same decks can be requested again
+    seed_used = data.get('seed') if data.get('seed') not in (None, '') else key
+
+    if output_format == 'binary':
+        return Response(decks.tobytes(), mimetype='application/octet-stream', headers={
+            'X-Deck-Count': str(count),
+            'X-Deck-Size': str(DECK_SIZE),
+            'X-Deck-Offset': str(offset),
+            'X-Seed-Used': str(seed_used),
+        })
+
+    result = {"count": count, "deck_size": DECK_SIZE, "offset": offset, "seed_used": seed_used}
+    if output_format == 'base64':
+        result["decks"] = base64.b64encode(decks.tobytes()).decode('ascii')
+    else:
+        result["decks"] = decks.tolist()
+    return jsonify(result)
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
@@ -248,4 +378,6 @@ if __name__ == '__main__':
     print("🃏 Cards Service starting on port 5002...")
     print("📊 40 Spanish cards loaded")
     print("🎴 Suits: Oros, Copas, Espadas, Bastos")
-    app.run(host='0.0.0.0', port=5002, debug=False)
+    # Served by waitress: unlike the Werkzeug dev server it keeps HTTP/1.1 connections
+    # open, so the gateway's pooled session reuses them
+    serve(app, host='0.0.0.0', port=5002, threads=int(os.environ.get('WSGI_THREADS', 16)))
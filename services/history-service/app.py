@@ -1,6 +1,9 @@
 from flask import Flask, request, jsonify
+from waitress import serve
 from datetime import datetime
 import psycopg2
+from db_pool import ConnectionPool
+from psycopg2.extras import execute_values
 import os
 import json
 import time
@@ -10,6 +13,8 @@ import re
 app = Flask(__name__)
 CORS(app)
 
+HISTORY_BATCH_MAX = int(os.environ.get('HISTORY_BATCH_MAX', 200))
+
 def wait_for_db(max_retries=30, retry_interval=2):
     """Wait for database to be ready"""
     print("🔄 Waiting for database connection...")
@@ -34,21 +39,28 @@ def wait_for_db(max_retries=30, retry_interval=2):
                 print(f"❌ Failed to connect to database after {max_retries} attempts: {e}")
                 return False
 
+# Pooled connections (db_pool.py): conn.close() hands the connection back to the pool
+DB_POOL = ConnectionPool(
+    minconn=int(os.environ.get('DB_POOL_MIN', 2)),
+    maxconn=int(os.environ.get('DB_POOL_MAX', 20)),
+    checkout_timeout=float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+    host=os.environ.get('DB_HOST', 'history-db'),
+    database=os.environ.get('DB_NAME', 'history_db'),
+    user=os.environ.get('DB_USER', 'user'),
+    password=os.environ.get('DB_PASSWORD', 'password'),
+    port=os.environ.get('DB_PORT', '5432')
+)
+DB_POOL.init_app(app)
+
 def get_db_connection():
-    conn = psycopg2.connect(
-        host=os.environ.get('DB_HOST', 'history-db'),
-        database=os.environ.get('DB_NAME', 'history_db'),
-        user=os.environ.get('DB_USER', 'user'),
-        password=os.environ.get('DB_PASSWORD', 'password'),
-        port=os.environ.get('DB_PORT', '5432')
-    )
-    return conn
+    return DB_POOL.getconn()
 
 def init_db():
     """Initialize database"""
     if not wait_for_db():
         print("❌ Cannot initialize database - connection failed")
         return False
+    DB_POOL.fill()
     
     conn = get_db_connection()
     cur = conn.cursor()
@@ -289,6 +301,91 @@ def save_match_result():
         cur.close()
         conn.close()
 
+@app.route('/history/matches/batch', methods=['POST'])
+def save_match_results():
+    """Save many finished matches in one transaction; idempotent on match_id
+
+    Body: {"matches": [match, ...]} with the same fields as POST /history/matches.
+    Each match is written under its own savepoint and comes back as "saved",
+    "duplicate" (already stored, nothing written), "invalid" (with details) or
+    "failed" (the database refused it, rolled back alone), so one bad record
+    never costs the rest of the batch and the sender can retry safely.
+    """
+    data = request.get_json(silent=True) or {}
+    matches = data.get('matches')
+    if not isinstance(matches, list) or not matches:
+        return jsonify({"error": "matches must be a non-empty list"}), 400
+    if len(matches) > HISTORY_BATCH_MAX:
+        return jsonify({"error": f"At most {HISTORY_BATCH_MAX} matches per batch"}), 400
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    results = []
+
+    try:
+        for match in matches:
+            errors = validate_match_data(match) if isinstance(match, dict) else ["Match must be a JSON object"]
+            match_id = match.get('match_id') if isinstance(match, dict) else None
+            if errors:
+                results.append({"match_id": match_id, "status": "invalid", "errors": errors})
+                continue
+
+            cur.execute('SAVEPOINT batch_match')
+            try:
+                cur.execute('''
+                    INSERT INTO matches (match_id, player1, player2, winner, scores, start_time, end_time, status)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (match_id) DO NOTHING
+                    RETURNING match_id
+                ''', (
+                    match_id,
+                    match['player1'],
+                    match['player2'],
+                    match['winner'],
+                    json.dumps(match['scores']),
+                    match.get('start_time'),
+                    match.get('end_time', datetime.now()),
+                    match.get('status', 'completed')
+                ))
+                if cur.fetchone() is None:
+                    cur.execute('RELEASE SAVEPOINT batch_match')
+                    results.append({"match_id": match_id, "status": "duplicate"})
+                    continue
+
+                moves = [
+                    (match_id, move['player'], move['card_played'], json.dumps(move.get('captured_cards', [])),
+                     move['result'], move.get('timestamp', datetime.now()))
+                    for move in match.get('moves', [])
+                    if all(k in move for k in ['player', 'card_played', 'result'])
+                ]
+                if moves:
+                    execute_values(cur, '''
+                        INSERT INTO match_moves (match_id, player, card_played, captured_cards, move_result, move_timestamp)
+                        VALUES %s
+                    ''', moves)
+                cur.execute('RELEASE SAVEPOINT batch_match')
+                results.append({"match_id": match_id, "status": "saved", "moves_saved": len(moves)})
+            except psycopg2.Error as e:
+                # Undo only this match; earlier records in the batch stay written
+                cur.execute('ROLLBACK TO SAVEPOINT batch_match')
+                cur.execute('RELEASE SAVEPOINT batch_match')
+                print(f"❌ Error saving match {match_id} from batch: {e}")
+                results.append({"match_id": match_id, "status": "failed", "error": str(e)})
+
+        conn.commit()
+        saved = sum(1 for r in results if r['status'] == 'saved')
+        print(f"✅ Saved {saved}/{len(matches)} matches from batch")
+        return jsonify({"count": len(results), "saved": saved, "results": results})
+
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Error saving match batch: {e}")
+        return jsonify({"error": f"Save error: {str(e)}"}), 500
+
+    finally:
+        cur.close()
+        conn.close()
+
 @app.route('/history/matches/<match_id>', methods=['GET'])
 def get_match_details(match_id):
     """Get complete match details including all moves"""
@@ -333,7 +430,7 @@ def get_match_details(match_id):
         # Calculate some statistics
         player1_moves = len([m for m in moves if m['player'] == player1])
         player2_moves = len([m for m in moves if m['player'] == player2])
-        scopas = len([m for m in moves if m['result'] == 'scopa'])
+        scopas = len([m for m in moves if m['result'] in ('scopa', 'escoba')])
         
         return jsonify({
             "match_id": match_id,
@@ -486,6 +583,7 @@ def health():
         return jsonify({
             "status": "History service is running",
             "database": "connected",
+            "database_pool": DB_POOL.stats(),
             "statistics": {
                 "matches_stored": matches_count,
                 "moves_stored": moves_count
@@ -496,6 +594,7 @@ def health():
         return jsonify({
             "status": "History service is running",
             "database": "disconnected",
+            "database_pool": DB_POOL.stats(),
             "error": str(e)
         }), 503
 
@@ -504,6 +603,7 @@ if __name__ == '__main__':
     if init_db():
         print("✅ History service starting on port 5005...")
         print("📊 Match history and statistics system ready")
-        app.run(host='0.0.0.0', port=5005, debug=False)
+        # Served by waitress so gateway requests reuse keep-alive connections
+        serve(app, host='0.0.0.0', port=5005, threads=int(os.environ.get('WSGI_THREADS', 16)))
     else:
         print("❌ Failed to initialize database")
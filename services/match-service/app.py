@@ -1,12 +1,26 @@
-from flask import Flask, request, jsonify
-import random
+from flask import Flask, Response, request, jsonify, stream_with_context
+from waitress import serve
+import time
 import uuid
 from datetime import datetime
+import json
 import redis
 import requests
-import json
 from flask_cors import CORS
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from rules import move_hints
+from engine import EscobaGame, match_view, legacy_to_state
+from scoring import score_batch, winner
+from history_outbox import HistoryOutbox, enqueue as enqueue_history
+from bot import is_bot, bot_level, choose_move
+from matchmaking import LevelCache, Matchmaker
+from state_codec import (
+    match_key, moves_key, events_channel, hand_field, hints_field, PUBLIC_FIELD, encode_fields, decode_fields, decode_public,
+    decode_hand, decode_hints, store_hints, fits_string, MAX_STRING_BYTES, encode_move, decode_moves, encode_update, decode_update, migrate_match,
+    migrate_legacy_matches, STATUSES,
+)
 
 app = Flask(__name__)
 CORS(app)
@@ -14,133 +28,613 @@ CORS(app)
 redis_client = redis.Redis(
     host=os.environ.get('REDIS_HOST', 'match-db'), 
     port=int(os.environ.get('REDIS_PORT', 6379)), 
-    db=0, 
-    decode_responses=True
+    db=0
 )
 
 HISTORY_SERVICE_URL = os.environ.get('HISTORY_SERVICE_URL', 'http://history-service:5005')
+PLAYER_SERVICE_URL = os.environ.get('PLAYER_SERVICE_URL', 'http://player-service:5004')
+
+# Finished matches reach history through the history:outbox stream (see history_outbox.py)
+HISTORY_OUTBOX = HistoryOutbox(
+    redis_client, HISTORY_SERVICE_URL,
+    batch_size=int(os.environ.get('HISTORY_BATCH_SIZE', 50)),
+    timeout=float(os.environ.get('HISTORY_TIMEOUT', 5)),
+    max_backoff=float(os.environ.get('HISTORY_MAX_BACKOFF', 30)),
+)
+
+# Expiry: idle active matches are archived to history as abandoned, finished ones just dropped
+# (their record was queued when they ended). Keys also get a Redis TTL a grace period later,
+# as a backstop in case no sweeper runs.
+MATCH_IDLE_TTL = int(os.environ.get('MATCH_IDLE_TTL', 24 * 3600))
+MATCH_FINISHED_TTL = int(os.environ.get('MATCH_FINISHED_TTL', 3600))
+MATCH_EXPIRY_GRACE = int(os.environ.get('MATCH_EXPIRY_GRACE', 3600))
+EXPIRY_SWEEP_INTERVAL = float(os.environ.get('EXPIRY_SWEEP_INTERVAL', 30))
+EXPIRY_SWEEP_BATCH = 100
+EXPIRY_KEY = 'matches:expiry'
+EXPIRY_STATS = {"sweeps": 0, "archived_abandoned": 0, "dropped_finished": 0, "conflicts": 0}
+
+# Optimistic concurrency: a move re-reads and re-applies when another write lands first
+MOVE_MAX_ATTEMPTS = int(os.environ.get('MOVE_MAX_ATTEMPTS', 10))
+MOVE_STATS = {"committed": 0, "conflicts": 0, "stale_version": 0, "gave_up": 0}
+# Views served with legal plays cached in the match hash (hits) or computed and stored (misses)
+HINT_STATS = {"hits": 0, "misses": 0}
+STATS_LOCK = threading.Lock()
+
+# Match streams: a comment line keeps idle connections (and proxies) alive
+STREAM_HEARTBEAT = float(os.environ.get('STREAM_HEARTBEAT', 15))
+STREAM_STATS = {"open": 0, "opened": 0, "events": 0}
+
+# Computer opponent (bot.py): seats named bot_easy / bot_medium / bot_hard move right after
+# the human's move. BOT_WORKERS > 1 splits each search over a process pool.
+BOT_WORKERS = int(os.environ.get('BOT_WORKERS', 0))
+BOT_POOL = None
+BOT_STATS = {"decisions": 0, "iterations": 0, "think_seconds": 0.0, "failed": 0}
 
-# --- LOGICA DI GIOCO ---
-class EscobaGame:
-    def __init__(self, match_id, player1, player2):
-        self.match_id = match_id
-        self.players = [player1, player2]
-        self.current_player = player1
-        self.deck = list(range(1, 41))
-        random.shuffle(self.deck)
-        self.table_cards = []
-        self.hands = {player1: [], player2: []}
-        self.captured = {player1: [], player2: []}
-        self.scores = {player1: 0, player2: 0}
-        self.status = "active"
-        self.moves_log = []
-        
-        # Distribuzione iniziale
-        for _ in range(3):
-            self.hands[player1].append(self.deck.pop())
-            self.hands[player2].append(self.deck.pop())
-        for _ in range(4):
-            self.table_cards.append(self.deck.pop())
-
-    def to_dict(self):
-        return self.__dict__
-    
-    @staticmethod
-    def from_dict(data):
-        game = EscobaGame(data["match_id"], data["players"][0], data["players"][1])
-        game.__dict__.update(data)
-        return game
-
-    def get_game_state(self, player):
-        return {
-            "match_id": self.match_id,
-            "players": self.players,
-            "current_player": self.current_player,
-            "your_hand": self.hands.get(player, []),
-            "table_cards": self.table_cards,
-            "scores": self.scores,
-            "status": self.status,
-            "captured_cards": self.captured.get(player, [])
-        }
-
-    def play_card(self, player, card_id):
-        if self.status != "active" or player != self.current_player:
-            return False, "Invalid move"
-        
-        if card_id not in self.hands[player]:
-            return False, "Card not in hand"
-        
-        # Logica base: gioca carta sul tavolo (semplificata per ora)
-        self.hands[player].remove(card_id)
-        self.table_cards.append(card_id)
-        
-        # Cambio turno
-        self.current_player = self.players[1] if player == self.players[0] else self.players[0]
-        
-        # Controllo fine mano/partita
-        if not self.hands[self.players[0]] and not self.hands[self.players[1]]:
-            if self.deck:
-                for _ in range(3):
-                    for p in self.players:
-                        self.hands[p].append(self.deck.pop())
-            else:
-                self.status = "finished"
-                self.scores = {p: random.randint(1,10) for p in self.players} # Punteggio simulato
-        
-        return True, "Card played"
-
-def send_match_to_history(game):
+# Matchmaking (matchmaking.py): players wait in a sorted set by level; levels come from
+# player-service and are cached here for LEVEL_CACHE_TTL seconds, LEVEL_CACHE_SIZE players at most
+LEVEL_CACHE = LevelCache(ttl=float(os.environ.get('LEVEL_CACHE_TTL', 300)),
+                         max_size=int(os.environ.get('LEVEL_CACHE_SIZE', 10000)))
+PLAYER_SESSION = requests.Session()
+
+def player_level(player):
+    cached = LEVEL_CACHE.get(player)
+    if cached is not None:
+        return cached
     try:
-        winner = max(game.scores, key=game.scores.get) if game.scores[game.players[0]] != game.scores[game.players[1]] else "draw"
-        payload = {
-            "match_id": game.match_id,
-            "player1": game.players[0],
-            "player2": game.players[1],
-            "winner": winner,
-            "scores": game.scores,
-            "start_time": datetime.now().isoformat(),
-            "end_time": datetime.now().isoformat(),
-            "moves": game.moves_log
-        }
-        requests.post(f"{HISTORY_SERVICE_URL}/history/matches", json=payload)
-        print(f"✅ Match {game.match_id} sent to history")
-    except Exception as e:
-        print(f"❌ History sync failed: {e}")
+        response = PLAYER_SESSION.get(f"{PLAYER_SERVICE_URL}/players/{player}/stats", timeout=2)
+        level = int(response.json()["level"]) if response.status_code == 200 else 1
+    except (requests.RequestException, ValueError, KeyError) as e:
+        # Better a rough pairing than no pairing: unknown players start at level 1
+        print(f"⚠️  Level lookup failed for {player}: {e}")
+        return 1
+    LEVEL_CACHE.put(player, level)
+    return level
+
+MATCHMAKER = Matchmaker(
+    redis_client, player_level,
+    window_base=float(os.environ.get('MATCHMAKING_WINDOW_BASE', 1)),
+    window_growth=float(os.environ.get('MATCHMAKING_WINDOW_GROWTH', 0.1)),
+    window_max=float(os.environ.get('MATCHMAKING_WINDOW_MAX', 10)),
+)
+
+def history_record(game, moves, status="completed"):
+    """Payload for history-service /history/matches/batch"""
+    timestamps = [m["timestamp"] for m in moves]
+    return {
+        "match_id": game.match_id,
+        "player1": game.players[0],
+        "player2": game.players[1],
+        "status": status,
+        "winner": winner(game.players, game.scores) if status == "completed" else None,
+        "scores": game.scores,
+        "start_time": datetime.fromtimestamp(min(timestamps, default=time.time())).isoformat(),
+        "end_time": datetime.fromtimestamp(max(timestamps, default=time.time())).isoformat(),
+        "moves": [dict(m, timestamp=datetime.fromtimestamp(m["timestamp"]).isoformat()) for m in moves]
+    }
+
+# --- STORAGE ---
+
+def save_game(game, client=None, fields=None):
+    """Write game fields (all by default) and append its new moves to match:<id>:moves"""
+    client = client or redis_client
+    encoded = encode_fields(game.to_dict())
+    if fields is not None:
+        encoded = {field: encoded[field] for field in fields}
+    client.hset(match_key(game.match_id), mapping=encoded)
+    # Legal plays cached for the previous state version are stale now
+    client.hdel(match_key(game.match_id), *(hints_field(player) for player in game.players))
+    if game.moves_log:
+        client.rpush(moves_key(game.match_id), *(encode_move(m, game.players) for m in game.moves_log))
+
+def read_match(client, command, match_id, *args):
+    """Run a read on match:<id>, moving a single-key match written by an older version out of the way first"""
+    try:
+        return command(match_key(match_id), *args)
+    except redis.ResponseError as e:
+        if 'WRONGTYPE' not in str(e):
+            raise
+        migrate_match(redis_client, match_key(match_id), legacy_to_state)
+        return command(match_key(match_id), *args)
+
+def load_game(match_id, client=None):
+    """Full game for a move: public state, both hands and the deck, but not the move log"""
+    client = client or redis_client
+    fields = read_match(client, client.hgetall, match_id)
+    if not fields:
+        return None
+    return EscobaGame.from_state(decode_fields(fields))
+
+def load_view(match_id, player):
+    """One player's view: reads only the public field, that player's hand and their cached legal plays"""
+    public, hand, hints = read_match(redis_client, redis_client.hmget, match_id,
+                                     PUBLIC_FIELD, hand_field(player or ''), hints_field(player or ''))
+    if not public:
+        return None
+    public = decode_public(public)
+    if player not in public["players"]:
+        return match_view(public, player, 0)
+    hand = decode_hand(hand)
+    cached = decode_hints(hints, public["version"])
+    count_hints("hits" if cached is not None else "misses")
+    if cached is None:
+        cached = move_hints(hand, public["table"])
+        store_hints(redis_client, match_id, player, public["version"], cached)
+    return match_view(public, player, hand, cached)
+
+def load_moves(match_id, players, client=None):
+    return decode_moves(b''.join((client or redis_client).lrange(moves_key(match_id), 0, -1)), players)
+
+def count_hints(outcome):
+    with STATS_LOCK:
+        HINT_STATS[outcome] += 1
+
+def count_move(outcome):
+    with STATS_LOCK:
+        MOVE_STATS[outcome] += 1
+
+def apply_move(match_id, player, card_id, capture=None, expected_version=None):
+    """Play one move with WATCH/MULTI so concurrent moves on a match are never lost.
+
+    Returns (game, error, status): error is None when the move was committed.
+    """
+    key = match_key(match_id)
+    with redis_client.pipeline() as pipe:
+        for _ in range(MOVE_MAX_ATTEMPTS):
+            try:
+                pipe.watch(key)
+                game = load_game(match_id, pipe)
+                if not game:
+                    return None, "Not found", 404
+                if expected_version is not None and expected_version != game.version:
+                    count_move("stale_version")
+                    return game, "Match state changed, reload and retry", 409
+                deck_size = len(game.deck)
+                previous_status = game.status
+                success, msg = game.play_card(player, card_id, capture)
+                if not success:
+                    return game, msg, 400
+                if game.status == "finished":
+                    record = history_record(game, load_moves(match_id, game.players, pipe) + game.moves_log)
+                pipe.multi()
+                index_match(pipe, game, previous_status)
+                # Only a new deal touches the deck and the other hand
+                save_game(game, pipe, None if len(game.deck) != deck_size else (PUBLIC_FIELD, hand_field(player)))
+                pipe.publish(events_channel(match_id), encode_update(game.to_dict()))
+                if game.status == "finished":
+                    # Same transaction as the final state: the record is queued exactly when the match ends
+                    enqueue_history(pipe, record)
+                schedule_expiry(pipe, game)
+                pipe.execute()
+                count_move("committed")
+                return game, None, msg
+            except redis.WatchError:
+                count_move("conflicts")
+    count_move("gave_up")
+    return None, "Too much contention on this match, retry", 409
+
+def bot_pool():
+    global BOT_POOL
+    if BOT_POOL is None and BOT_WORKERS > 1:
+        BOT_POOL = ProcessPoolExecutor(max_workers=BOT_WORKERS)
+    return BOT_POOL
+
+def play_bot_turns(game):
+    """Let bot seats move while it is their turn; returns the bot moves committed"""
+    moves = []
+    while game.status == "active" and is_bot(game.current_player):
+        bot = game.current_player
+        start = time.perf_counter()
+        # The bot gets the public state and its own hand only, never the opponent's hand or the deck order
+        card_id, capture, info = choose_move(game.public_state(), bot, game.hands[bot], bot_level(bot),
+                                             pool=bot_pool(), workers=BOT_WORKERS)
+        with STATS_LOCK:
+            BOT_STATS["decisions"] += 1
+            BOT_STATS["iterations"] += info["iterations"]
+            BOT_STATS["think_seconds"] += time.perf_counter() - start
+        played, error, _ = apply_move(game.match_id, bot, card_id, capture, expected_version=game.version)
+        if error:
+            # The human moved again meanwhile or the match is gone; the next request retries
+            with STATS_LOCK:
+                BOT_STATS["failed"] += 1
+            print(f"⚠️  Bot move in {game.match_id} not applied: {error}")
+            break
+        game = played
+        moves.append(game.moves_log[-1])
+    return game, moves
+
+# --- INDEXES ---
+# Sorted sets of match ids scored by last activity (epoch seconds), newest first when listing
+
+MATCH_LIST_MAX_LIMIT = 100
+
+def index_keys(players, status):
+    keys = ["matches:all", f"matches:status:{status}"]
+    for player in players:
+        keys.append(f"matches:player:{player}")
+        keys.append(f"matches:player:{player}:{status}")
+    return keys
+
+def index_key(player=None, status=None):
+    """The one index that answers a listing query"""
+    if player:
+        return f"matches:player:{player}:{status}" if status else f"matches:player:{player}"
+    return f"matches:status:{status}" if status else "matches:all"
+
+def index_match(pipe, game, previous_status=None, activity=None):
+    """Queue index updates for game on pipe (inside the MULTI that writes it)"""
+    keys = index_keys(game.players, game.status)
+    if previous_status and previous_status != game.status:
+        for key in index_keys(game.players, previous_status):
+            if key not in keys:
+                pipe.zrem(key, game.match_id)
+    for key in keys:
+        pipe.zadd(key, {game.match_id: activity or time.time()})
+
+def backfill_match_indexes(batch_size=500):
+    """Index and schedule expiry for matches stored before either existed; NX keeps newer scores"""
+    indexed = 0
+    for key in redis_client.scan_iter(match='match:*', count=batch_size, _type='hash'):
+        public = redis_client.hget(key, PUBLIC_FIELD)
+        if not public:
+            continue
+        public = decode_public(public)
+        last_move = redis_client.lindex(moves_key(public["match_id"]), -1)
+        activity = decode_moves(last_move, public["players"])[0]["timestamp"] if last_move else time.time()
+        with redis_client.pipeline() as pipe:
+            for index in index_keys(public["players"], public["status"]):
+                pipe.zadd(index, {public["match_id"]: activity}, nx=True)
+            pipe.zadd(EXPIRY_KEY, {public["match_id"]: activity + match_ttl(public["status"])}, nx=True)
+            indexed += sum(pipe.execute()[:-1])
+    return indexed
+
+# --- EXPIRY ---
+
+def match_ttl(status):
+    return MATCH_IDLE_TTL if status == "active" else MATCH_FINISHED_TTL
+
+def schedule_expiry(pipe, game):
+    """Queue on pipe: push the match deadline back and refresh the backstop TTL of its keys"""
+    ttl = match_ttl(game.status)
+    pipe.zadd(EXPIRY_KEY, {game.match_id: time.time() + ttl})
+    pipe.expire(match_key(game.match_id), ttl + MATCH_EXPIRY_GRACE)
+    pipe.expire(moves_key(game.match_id), ttl + MATCH_EXPIRY_GRACE)
+
+def count_expiry(key):
+    with STATS_LOCK:
+        EXPIRY_STATS[key] += 1
+
+def expire_match(match_id, now):
+    """Archive (if still active) and delete one match whose deadline passed"""
+    key = match_key(match_id)
+    with redis_client.pipeline() as pipe:
+        try:
+            # A move in between rewrites the key and so aborts this
+            pipe.watch(key)
+            deadline = pipe.zscore(EXPIRY_KEY, match_id)
+            if deadline is None or deadline > now:
+                return
+            game = load_game(match_id, pipe)
+            moves = load_moves(match_id, game.players, pipe) if game and game.status == "active" else []
+            pipe.multi()
+            if game:
+                for index in index_keys(game.players, game.status):
+                    pipe.zrem(index, match_id)
+                if game.status == "active":
+                    enqueue_history(pipe, history_record(game, moves, status="abandoned"))
+                pipe.delete(key, moves_key(match_id))
+            pipe.zrem(EXPIRY_KEY, match_id)
+            pipe.execute()
+        except redis.WatchError:
+            count_expiry("conflicts")
+            return
+    if game:
+        count_expiry("archived_abandoned" if game.status == "active" else "dropped_finished")
+
+def sweep_expired_matches(batch_size=EXPIRY_SWEEP_BATCH):
+    now = time.time()
+    due = redis_client.zrangebyscore(EXPIRY_KEY, '-inf', now, start=0, num=batch_size)
+    for match_id in due:
+        expire_match(match_id.decode(), now)
+    count_expiry("sweeps")
+    return len(due)
+
+def run_expiry_sweeper():
+    while True:
+        try:
+            # Keep going while whole batches are due, otherwise wait for the next round
+            while sweep_expired_matches() == EXPIRY_SWEEP_BATCH:
+                pass
+        except redis.RedisError as e:
+            print(f"⚠️  Match expiry sweep failed: {e}")
+        time.sleep(EXPIRY_SWEEP_INTERVAL)
+
+def expiry_stats():
+    with STATS_LOCK:
+        stats = dict(EXPIRY_STATS)
+    stats["scheduled"] = redis_client.zcard(EXPIRY_KEY)
+    stats["overdue"] = redis_client.zcount(EXPIRY_KEY, '-inf', time.time())
+    try:
+        redis_stats = redis_client.info('stats')
+    except redis.ResponseError:
+        # INFO can be disabled on managed Redis
+        redis_stats = {}
+    # Keys Redis dropped by itself: backstop TTLs that fired, and maxmemory evictions
+    stats["redis_expired_keys"] = redis_stats.get('expired_keys')
+    stats["redis_evicted_keys"] = redis_stats.get('evicted_keys')
+    stats["idle_ttl"] = MATCH_IDLE_TTL
+    stats["finished_ttl"] = MATCH_FINISHED_TTL
+    return stats
+
+def list_matches(player=None, status=None, limit=20, offset=0):
+    """One ZREVRANGE page plus one pipelined HGET per match: O(log n + page)"""
+    key = index_key(player, status)
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zcard(key)
+        pipe.zrevrange(key, offset, offset + limit - 1, withscores=True)
+        total, page = pipe.execute()
+
+    with redis_client.pipeline(transaction=False) as pipe:
+        for match_id, _ in page:
+            pipe.hget(match_key(match_id.decode()), PUBLIC_FIELD)
+        publics = pipe.execute()
+
+    matches, missing = [], []
+    for (match_id, activity), public in zip(page, publics):
+        if not public:
+            missing.append(match_id)
+            continue
+        public = decode_public(public)
+        matches.append({
+            "match_id": public["match_id"],
+            "players": public["players"],
+            "status": public["status"],
+            "current_player": public["current_player"],
+            "scores": public["scores"],
+            "version": public["version"],
+            "last_activity": datetime.fromtimestamp(activity).isoformat(),
+        })
+    if missing:
+        # Match deleted underneath the index: drop the stale entry
+        redis_client.zrem(key, *missing)
+    return total, matches
+
+def start_match(player1, player2, match_id=None, paired=False):
+    """Deal, store and index a new match; paired matches also tell both players where to go"""
+    game = EscobaGame(match_id or str(uuid.uuid4()), player1, player2)
+    with redis_client.pipeline() as pipe:
+        save_game(game, pipe)
+        index_match(pipe, game)
+        schedule_expiry(pipe, game)
+        if paired:
+            MATCHMAKER.record_match(pipe, game.players, game.match_id)
+        pipe.execute()
+    # A bot in the first seat opens the match
+    play_bot_turns(game)
+    return game
 
 # --- ENDPOINTS ---
 
 @app.route('/match', methods=['POST'])
 def create_match():
-    data = request.json
-    match_id = str(uuid.uuid4())
-    game = EscobaGame(match_id, data['player1'], data['player2'])
-    redis_client.set(f"match:{match_id}", json.dumps(game.to_dict()))
-    return jsonify({"match_id": match_id, "status": "active"}), 201
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Body must be a JSON object"}), 400
+    if not (fits_string(data.get('player1')) and fits_string(data.get('player2'))):
+        return jsonify({"error": f"player1 and player2 must be names of 1 to {MAX_STRING_BYTES} UTF-8 bytes"}), 400
+    if is_bot(data['player1']) and is_bot(data['player2']):
+        return jsonify({"error": "At least one player must be human"}), 400
+    game = start_match(data['player1'], data['player2'])
+    return jsonify({"match_id": game.match_id, "status": "active"}), 201
+
+# --- MATCHMAKING ---
+
+def matched(player, opponent):
+    """Start the match for a pair; whoever was already waiting plays first"""
+    game = start_match(opponent, player, paired=True)
+    return {"status": "matched", "match_id": game.match_id, "opponent": opponent}
+
+@app.route('/matchmaking', methods=['POST'])
+def join_matchmaking():
+    """Join the queue: {"player": name} -> matched (with match_id) or waiting"""
+    player = (request.get_json(silent=True) or {}).get('player')
+    if not isinstance(player, str) or not player:
+        return jsonify({"error": "player is required"}), 400
+    if not fits_string(player):
+        return jsonify({"error": f"player must be at most {MAX_STRING_BYTES} UTF-8 bytes"}), 400
+    if is_bot(player):
+        return jsonify({"error": "Bots do not queue, start a match against one instead"}), 400
+    level, opponent = MATCHMAKER.join(player)
+    if opponent:
+        return jsonify(dict(matched(player, opponent), level=level)), 201
+    return jsonify(MATCHMAKER.status(player)), 202
+
+@app.route('/matchmaking/<player>', methods=['GET'])
+def matchmaking_status(player):
+    """Poll while waiting: retries pairing with the window widened by the time waited"""
+    opponent = MATCHMAKER.pair(player)
+    if opponent:
+        return jsonify(matched(player, opponent))
+    return jsonify(MATCHMAKER.status(player))
+
+@app.route('/matchmaking/<player>', methods=['DELETE'])
+def leave_matchmaking(player):
+    if not MATCHMAKER.leave(player):
+        return jsonify({"error": "Not queued"}), 404
+    return jsonify({"status": "left"})
+
+@app.route('/match', methods=['GET'])
+def get_matches():
+    """Paginated match listing, newest activity first: ?player=&status=&limit=&offset="""
+    player = request.args.get('player')
+    status = request.args.get('status')
+    if status and status not in STATUSES:
+        return jsonify({"error": f"status must be one of {', '.join(STATUSES)}"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), MATCH_LIST_MAX_LIMIT)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+
+    total, matches = list_matches(player, status, limit, offset)
+    return jsonify({
+        "player": player,
+        "status": status,
+        "total_matches": total,
+        "returned_matches": len(matches),
+        "pagination": {
+            "limit": limit,
+            "offset": offset,
+            "has_more": offset + limit < total
+        },
+        "matches": matches
+    })
 
 @app.route('/match/<match_id>', methods=['GET'])
 def get_match(match_id):
-    data = redis_client.get(f"match:{match_id}")
-    if not data: return jsonify({"error": "Not found"}), 404
-    game = EscobaGame.from_dict(json.loads(data))
-    return jsonify(game.get_game_state(request.args.get('player')))
+    view = load_view(match_id, request.args.get('player'))
+    if not view: return jsonify({"error": "Not found"}), 404
+    return jsonify(view)
 
 @app.route('/match/<match_id>/play', methods=['POST'])
 def play_card(match_id):
-    data = redis_client.get(f"match:{match_id}")
-    if not data: return jsonify({"error": "Not found"}), 404
-    
-    game = EscobaGame.from_dict(json.loads(data))
-    success, msg = game.play_card(request.json['player'], int(request.json['card_id']))
-    
-    if success:
-        if game.status == "finished":
-            send_match_to_history(game) # INTEGRAZIONE CRITICA QUI
-        redis_client.set(f"match:{match_id}", json.dumps(game.to_dict()))
-        return jsonify({"message": msg, "game_state": game.get_game_state(request.json['player'])})
-    return jsonify({"error": msg}), 400
+    data = request.json
+    expected_version = data.get('expected_version')
+    if expected_version is not None and not isinstance(expected_version, int):
+        return jsonify({"error": "expected_version must be an integer"}), 400
+
+    game, error, result = apply_move(match_id, data['player'], int(data['card_id']), data.get('capture'), expected_version)
+    if error:
+        body = {"error": error}
+        if result == 409 and game:
+            body["version"] = game.version
+        return jsonify(body), result
+
+    game, bot_moves = play_bot_turns(game)
+    return jsonify({"message": "Card played", "result": result, "game_state": game.get_game_state(data['player']),
+                    "bot_moves": bot_moves})
+
+def sse(event, data, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+def count_stream(key, delta=1):
+    with STATS_LOCK:
+        STREAM_STATS[key] += delta
+
+@app.route('/match/<match_id>/stream', methods=['GET'])
+def stream_match(match_id):
+    """Server-sent events for one player's view: a full "state", then a "delta" per move
+
+    Moves are fanned out through Redis pub/sub, so the instance that applied a
+    move does not need to be the one holding the stream.
+    """
+    player = request.args.get('player')
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    # Subscribe before reading the state so no move can fall in between
+    pubsub.subscribe(events_channel(match_id))
+    view = load_view(match_id, player)
+    if not view:
+        pubsub.close()
+        return jsonify({"error": "Not found"}), 404
+
+    def events(view):
+        count_stream("open")
+        count_stream("opened")
+        try:
+            yield sse("state", view, view["version"])
+            while view["status"] == "active":
+                message = pubsub.get_message(timeout=STREAM_HEARTBEAT)
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                public, hands = decode_update(message["data"])
+                if public["version"] <= view["version"]:
+                    continue
+                latest = match_view(public, player, hands.get(player, 0))
+                delta = {key: value for key, value in latest.items() if view.get(key) != value}
+                delta["version"] = latest["version"]
+                view = latest
+                count_stream("events")
+                yield sse("delta", delta, view["version"])
+        finally:
+            count_stream("open", -1)
+            pubsub.close()
+
+    return Response(stream_with_context(events(view)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def is_card_list(pile):
+    return isinstance(pile, list) and all(type(card) is int and 1 <= card <= 40 for card in pile)
+
+@app.route('/match/score', methods=['POST'])
+def score_matches():
+    """Score finished games in bulk (replays, re-scoring stored history)
+
+    Body: {"games": [{"players": [p1, p2], "captured": {p1: [ids], p2: [ids]}, "escobas": {p1: n, p2: n}}]}
+    Captured piles must be lists of card ids (1-40); card masks are only accepted internally.
+    """
+    data = request.get_json(silent=True)
+    games = data.get('games') if isinstance(data, dict) else None
+    if not isinstance(games, list) or not games:
+        return jsonify({"error": "games must be a non-empty list"}), 400
+    try:
+        piles = [(g['captured'][g['players'][0]], g['captured'][g['players'][1]]) for g in games]
+        if not all(is_card_list(pile) for pair in piles for pile in pair):
+            return jsonify({"error": "captured piles must be lists of card ids between 1 and 40"}), 400
+        escobas = [(g.get('escobas', {}).get(g['players'][0], 0), g.get('escobas', {}).get(g['players'][1], 0))
+                   for g in games]
+        points, breakdown = score_batch(piles, escobas)
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid game data: {str(e)}"}), 400
+
+    results = []
+    for i, g in enumerate(games):
+        players = g['players'][:2]
+        scores = {player: int(points[i, j]) for j, player in enumerate(players)}
+        results.append({
+            "players": players,
+            "scores": scores,
+            "winner": winner(players, scores),
+            "breakdown": {player: {k: int(v[i, j]) for k, v in breakdown.items()} for j, player in enumerate(players)},
+        })
+    return jsonify({"count": len(results), "results": results})
 
 @app.route('/health', methods=['GET'])
 def health(): return jsonify({"status": "Match service running"})
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    with STATS_LOCK:
+        moves = dict(MOVE_STATS)
+        streams = dict(STREAM_STATS)
+        bot = dict(BOT_STATS)
+        hints = dict(HINT_STATS)
+    bot["avg_think_ms"] = round(bot["think_seconds"] / bot["decisions"] * 1000, 2) if bot["decisions"] else 0.0
+    attempts = moves["committed"] + moves["conflicts"]
+    moves["conflict_rate"] = round(moves["conflicts"] / attempts, 4) if attempts else 0.0
+    return jsonify({"moves": moves, "streams": streams, "history_outbox": HISTORY_OUTBOX.stats(),
+                    "expiry": expiry_stats(), "bot": bot, "matchmaking": dict(MATCHMAKER.stats(), level_cache=LEVEL_CACHE.stats()),
+                    "move_hints_cache": hints,
+                    "timestamp": datetime.now().isoformat()})
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5003)
+    try:
+        print(f"🔄 Migrated {migrate_legacy_matches(redis_client, legacy_to_state)} legacy match keys")
+    except redis.RedisError as e:
+        print(f"⚠️  Legacy match migration skipped: {e}")
+    try:
+        print(f"🗂️  Indexed {backfill_match_indexes()} existing matches")
+    except redis.RedisError as e:
+        print(f"⚠️  Match index backfill skipped: {e}")
+    if os.environ.get('HISTORY_OUTBOX_WORKER', '1') == '1':
+        HISTORY_OUTBOX.start()
+        print(f"📤 History outbox worker started ({HISTORY_OUTBOX.consumer})")
+    if os.environ.get('EXPIRY_SWEEPER', '1') == '1':
+        threading.Thread(target=run_expiry_sweeper, name='expiry-sweeper', daemon=True).start()
+        print(f"⏳ Match expiry sweeper started (idle {MATCH_IDLE_TTL}s, finished {MATCH_FINISHED_TTL}s)")
+    # waitress keeps upstream connections alive for the gateway pool and streams the
+    # SSE responses as they are yielded; each open stream holds one of the threads
+    serve(app, host='0.0.0.0', port=5003, threads=int(os.environ.get('WSGI_THREADS', 64)))
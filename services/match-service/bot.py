@@ -0,0 +1,243 @@
+"""Computer opponent: determinized Monte Carlo tree search on card masks.
+
+The bot only sees what its seat sees: its hand, the table, both captured
+piles, escobas and the deck size. Each search iteration deals the unseen
+cards at random into the opponent's hand and the deck (a determinization),
+picks a move at the root with UCT, walks down the tree and finishes the
+game with a quick capture-first rollout.
+
+Nodes live in a transposition table keyed on the card masks the bot can
+see (its hand, the table, captured piles), not on the hidden cards: every
+determinization updates the same nodes for positions the bot cannot tell
+apart, and a position reached through different move orders is searched
+once. At opponent nodes only the moves possible in the current
+determinization are considered. A search stops at the level's time budget or node budget,
+whichever comes first, and can be split over a process pool (root
+parallelization: each worker searches with its own seed and the root
+statistics are summed).
+"""
+import math
+import random
+import time
+
+from rules import cards_of, card_bit, capture_value, is_escoba, legal_moves, FULL_DECK_MASK
+from scoring import score_batch
+
+BOT_PREFIX = 'bot_'
+
+# time_ms: per-move thinking time, nodes: search iterations (each adds at most one tree node)
+BOT_LEVELS = {
+    "easy": {"time_ms": 15, "nodes": 50},
+    "medium": {"time_ms": 100, "nodes": 400},
+    "hard": {"time_ms": 500, "nodes": 4000},
+}
+DEFAULT_LEVEL = "medium"
+
+# Seat names that are played by the bot; bot_player is what the frontend's quick match uses
+BOT_PLAYERS = {f"{BOT_PREFIX}{level}": level for level in BOT_LEVELS}
+BOT_PLAYERS[f"{BOT_PREFIX}player"] = DEFAULT_LEVEL
+
+EXPLORATION = 0.7
+# Rollouts take a capture this often when one exists, otherwise play at random
+ROLLOUT_CAPTURE_RATE = 0.8
+
+def is_bot(player):
+    return player in BOT_PLAYERS
+
+def bot_level(player):
+    return BOT_PLAYERS.get(player)
+
+class SearchState:
+    """Minimal copy of an EscobaGame for search: players are seats 0 and 1, no move log, no timestamps"""
+
+    __slots__ = ('hands', 'table', 'captured', 'escobas', 'last_capturer', 'turn', 'deck', 'finished')
+
+    def copy(self):
+        state = SearchState.__new__(SearchState)
+        state.hands = list(self.hands)
+        state.table = self.table
+        state.captured = list(self.captured)
+        state.escobas = list(self.escobas)
+        state.last_capturer = self.last_capturer
+        state.turn = self.turn
+        state.deck = list(self.deck)
+        state.finished = self.finished
+        return state
+
+    def key(self, seat):
+        """Transposition key of the position as seen from seat (the other hand is left out)"""
+        return (self.hands[seat], self.table, self.captured[0], self.captured[1],
+                self.escobas[0], self.escobas[1], self.last_capturer, self.turn, len(self.deck))
+
+    def moves(self):
+        """[(card_id, capture mask), ...]: one entry per capture option, a plain drop when the card has none"""
+        return [(card_id, option) for card_id, options in legal_moves(self.hands[self.turn], self.table)
+                for option in (options or (0,))]
+
+    def play(self, card_id, capture_mask):
+        """Same rules as EscobaGame.play_card, including the deal and the end-of-game table sweep"""
+        turn = self.turn
+        bit = card_bit(card_id)
+        self.hands[turn] ^= bit
+        if capture_mask:
+            if is_escoba(capture_mask, self.table):
+                self.escobas[turn] += 1
+            self.table ^= capture_mask
+            self.captured[turn] |= capture_mask | bit
+            self.last_capturer = turn
+        else:
+            self.table |= bit
+        self.turn = 1 - turn
+        if not self.hands[0] and not self.hands[1]:
+            if self.deck:
+                for _ in range(3):
+                    for seat in (0, 1):
+                        self.hands[seat] |= card_bit(self.deck.pop())
+            else:
+                if self.last_capturer is not None:
+                    self.captured[self.last_capturer] |= self.table
+                    self.table = 0
+                self.finished = True
+
+    def reward(self, seat):
+        """1 for a win, 0.5 for a draw, 0 for a loss, from seat's point of view"""
+        points, _ = score_batch([tuple(self.captured)], [tuple(self.escobas)])
+        mine, theirs = int(points[0, seat]), int(points[0, 1 - seat])
+        return 1.0 if mine > theirs else 0.5 if mine == theirs else 0.0
+
+def observe(public, player, hand):
+    """What the bot's seat knows -> (seat, SearchState without the opponent hand and deck, unseen card ids)
+
+    public is EscobaGame.public_state() or decode_public(); hand is the bot's hand mask.
+    """
+    players = public["players"]
+    seat = players.index(player)
+    state = SearchState.__new__(SearchState)
+    state.hands = [0, 0]
+    state.hands[seat] = hand
+    state.table = public["table"]
+    state.captured = [public["captured"][p] for p in players]
+    state.escobas = [public["escobas"][p] for p in players]
+    state.last_capturer = players.index(public["last_capturer"]) if public["last_capturer"] is not None else None
+    state.turn = players.index(public["current_player"])
+    state.deck = []
+    state.finished = public["status"] != "active"
+    seen = hand | state.table | state.captured[0] | state.captured[1]
+    unseen = cards_of(FULL_DECK_MASK & ~seen)
+    deck_size = public["remaining_deck"]
+    return seat, state, unseen, deck_size
+
+def determinize(state, seat, unseen, deck_size, rng):
+    """Deal the unseen cards at random: opponent hand first, the rest is the deck"""
+    cards = list(unseen)
+    rng.shuffle(cards)
+    world = state.copy()
+    opponent_cards = len(cards) - deck_size
+    world.hands[1 - seat] = 0
+    for card_id in cards[:opponent_cards]:
+        world.hands[1 - seat] |= card_bit(card_id)
+    world.deck = cards[opponent_cards:]
+    return world
+
+def rollout(state, rng):
+    while not state.finished:
+        table = state.table
+        options = legal_moves(state.hands[state.turn], table)
+        captures = [(card_id, option) for card_id, card_options in options for option in card_options]
+        if captures and rng.random() < ROLLOUT_CAPTURE_RATE:
+            card_id, capture_mask = max(captures, key=lambda move: capture_value(move[1], table))
+        else:
+            card_id, card_options = rng.choice(options)
+            capture_mask = rng.choice(card_options) if card_options else 0
+        state.play(card_id, capture_mask)
+
+def select(stats, visits, moves, rng):
+    """UCT over [visits, reward] per move; untried moves first"""
+    untried = [move for move in moves if move not in stats]
+    if untried:
+        move = rng.choice(untried)
+        stats[move] = [0, 0.0]
+        return move
+    log_visits = math.log(visits or 1)
+    return max(moves, key=lambda move: stats[move][1] / stats[move][0]
+               + EXPLORATION * math.sqrt(log_visits / stats[move][0]))
+
+def search(public, player, hand, time_ms, nodes, seed=None):
+    """Run one search; returns ({(card_id, capture mask): [visits, reward]}, iterations, tree size)"""
+    rng = random.Random(seed)
+    seat, state, unseen, deck_size = observe(public, player, hand)
+    root_moves = state.moves()
+    root = {}
+    tree = {}
+    deadline = time.perf_counter() + time_ms / 1000
+    iterations = 0
+    while iterations < nodes and (iterations & 15 or time.perf_counter() < deadline):
+        world = determinize(state, seat, unseen, deck_size, rng)
+        move = select(root, iterations, root_moves, rng)
+        path = [(root[move], seat)]
+        world.play(*move)
+        while not world.finished:
+            key = world.key(seat)
+            node = tree.get(key)
+            if node is None:
+                tree[key] = [0, {}]
+                break
+            node[0] += 1
+            move = select(node[1], node[0], world.moves(), rng)
+            path.append((node[1][move], world.turn))
+            world.play(*move)
+        rollout(world, rng)
+        reward = world.reward(seat)
+        for entry, mover in path:
+            entry[0] += 1
+            entry[1] += reward if mover == seat else 1.0 - reward
+        iterations += 1
+    return root, iterations, len(tree)
+
+def merge_roots(roots):
+    merged = {}
+    for root in roots:
+        for move, (visits, reward) in root.items():
+            entry = merged.setdefault(move, [0, 0.0])
+            entry[0] += visits
+            entry[1] += reward
+    return merged
+
+def choose_move(public, player, hand, level=DEFAULT_LEVEL, pool=None, workers=1, seed=None):
+    """Pick the bot's move -> (card_id, capture card ids, search info)
+
+    With a process pool, the level's node budget is split over `workers` searches
+    that run in parallel for the same time budget.
+    """
+    budget = BOT_LEVELS[level]
+    moves = [(card_id, option) for card_id, options in legal_moves(hand, public["table"]) for option in (options or (0,))]
+    if len(moves) == 1:
+        card_id, capture_mask = moves[0]
+        return card_id, cards_of(capture_mask), {"iterations": 0, "tree_size": 0}
+
+    if pool is not None and workers > 1:
+        base_seed = random.Random(seed).getrandbits(32)
+        searches = [pool.submit(search, public, player, hand, budget["time_ms"], math.ceil(budget["nodes"] / workers),
+                                base_seed + worker) for worker in range(workers)]
+        results = [future.result() for future in searches]
+        root = merge_roots(result[0] for result in results)
+        iterations = sum(result[1] for result in results)
+        tree_size = sum(result[2] for result in results)
+    else:
+        root, iterations, tree_size = search(public, player, hand, budget["time_ms"], budget["nodes"], seed)
+
+    # Most visited move: steadier than the best average on few visits
+    card_id, capture_mask = max(root, key=lambda move: (root[move][0], root[move][1]))
+    return card_id, cards_of(capture_mask), {"iterations": iterations, "tree_size": tree_size}
+
+def bot_policy(level):
+    """simulator.py policy for a level, e.g. "bot:medium_policy" to pit the bot against other policies"""
+    def policy(game, player, rng):
+        card_id, capture, _ = choose_move(game.public_state(), player, game.hands[player], level,
+                                          seed=rng.getrandbits(32))
+        return card_id, capture
+    return policy
+
+easy_policy = bot_policy("easy")
+medium_policy = bot_policy("medium")
+hard_policy = bot_policy("hard")
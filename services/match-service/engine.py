@@ -0,0 +1,178 @@
+"""La Escoba game engine: the EscobaGame state machine and per-player views.
+
+Pure game logic on card masks (rules.py) and scoring (scoring.py): no Flask,
+no Redis, no HTTP, so the simulator, the bot, the benchmarks and
+process-pool workers can import it without starting the service.
+"""
+import random
+import time
+from datetime import datetime
+
+from rules import card_bit, mask_of, cards_of, capture_options, best_capture, is_escoba, move_hints
+from scoring import score_game
+
+class EscobaGame:
+    """Hands, table and captured piles are 40-bit card masks (see rules.py).
+
+    Games loaded from Redis carry only the moves played since they were loaded
+    in moves_log; the full log is the append-only match:<id>:moves list.
+    """
+
+    __slots__ = ('version', 'match_id', 'players', 'current_player', 'deck', 'table', 'hands', 'captured',
+                 'escobas', 'last_capturer', 'scores', 'status', 'moves_log')
+
+    def __init__(self, match_id, player1, player2, rng=random):
+        """rng shuffles the deck; pass a seeded random.Random for reproducible deals"""
+        self.version = 0
+        self.match_id = match_id
+        self.players = [player1, player2]
+        self.current_player = player1
+        self.deck = list(range(1, 41))
+        rng.shuffle(self.deck)
+        self.table = 0
+        self.hands = {player1: 0, player2: 0}
+        self.captured = {player1: 0, player2: 0}
+        self.escobas = {player1: 0, player2: 0}
+        self.last_capturer = None
+        self.scores = {player1: 0, player2: 0}
+        self.status = "active"
+        self.moves_log = []
+        
+        # Distribuzione iniziale
+        for _ in range(3):
+            self.hands[player1] |= card_bit(self.deck.pop())
+            self.hands[player2] |= card_bit(self.deck.pop())
+        for _ in range(4):
+            self.table |= card_bit(self.deck.pop())
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a stored game as-is: no shuffle, no deal, no copies"""
+        game = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(game, name, state[name])
+        return game
+
+    @classmethod
+    def from_dict(cls, data):
+        """Like from_state, but also accepts the older JSON layouts"""
+        if "table_cards" in data:
+            # Matches stored before card masks: card id lists, no escoba tracking
+            data = dict(data)
+            data["table"] = mask_of(data.pop("table_cards"))
+            data["hands"] = {p: mask_of(cards) for p, cards in data["hands"].items()}
+            data["captured"] = {p: mask_of(cards) for p, cards in data["captured"].items()}
+            data.setdefault("escobas", {p: 0 for p in data["players"]})
+            data.setdefault("last_capturer", None)
+        if any(isinstance(m.get("timestamp"), str) for m in data.get("moves_log", [])):
+            data = dict(data)
+            data["moves_log"] = [dict(m, timestamp=datetime.fromisoformat(m["timestamp"]).timestamp())
+                                 if isinstance(m.get("timestamp"), str) else m for m in data["moves_log"]]
+        if "version" not in data:
+            data = dict(data, version=len(data["moves_log"]))
+        return cls.from_state(data)
+
+    def public_state(self):
+        return {
+            "version": self.version,
+            "match_id": self.match_id,
+            "players": self.players,
+            "current_player": self.current_player,
+            "table": self.table,
+            "captured": self.captured,
+            "escobas": self.escobas,
+            "last_capturer": self.last_capturer,
+            "scores": self.scores,
+            "status": self.status,
+            "remaining_deck": len(self.deck),
+        }
+
+    def get_game_state(self, player):
+        return match_view(self.public_state(), player, self.hands.get(player, 0))
+
+    def play_card(self, player, card_id, capture=None):
+        """Play card_id; capture optionally names the table cards to take (must sum to 15 with it)"""
+        if self.status != "active" or player != self.current_player:
+            return False, "Invalid move"
+        
+        bit = card_bit(card_id) if 1 <= card_id <= 40 else 0
+        if not self.hands[player] & bit:
+            return False, "Card not in hand"
+
+        options = capture_options(card_id, self.table)
+        if capture is not None:
+            if not isinstance(capture, list) or not all(isinstance(c, int) and 1 <= c <= 40 for c in capture):
+                return False, "Invalid capture"
+            capture_mask = mask_of(capture)
+            if capture_mask not in options and not (capture_mask == 0 and not options):
+                return False, "Invalid capture"
+        else:
+            capture_mask = best_capture(card_id, self.table)
+
+        self.hands[player] ^= bit
+        if capture_mask:
+            result = "escoba" if is_escoba(capture_mask, self.table) else "capture"
+            self.table ^= capture_mask
+            self.captured[player] |= capture_mask | bit
+            self.last_capturer = player
+            if result == "escoba":
+                self.escobas[player] += 1
+        else:
+            result = "drop"
+            self.table |= bit
+
+        self.moves_log.append({
+            "player": player,
+            "card_played": card_id,
+            "captured_cards": cards_of(capture_mask),
+            "result": result,
+            "timestamp": time.time()
+        })
+        
+        self.version += 1
+
+        # Cambio turno
+        self.current_player = self.players[1] if player == self.players[0] else self.players[0]
+        
+        # Controllo fine mano/partita
+        if not self.hands[self.players[0]] and not self.hands[self.players[1]]:
+            if self.deck:
+                for _ in range(3):
+                    for p in self.players:
+                        self.hands[p] |= card_bit(self.deck.pop())
+            else:
+                # Le carte rimaste sul tavolo vanno all'ultimo che ha preso
+                if self.last_capturer and self.table:
+                    self.captured[self.last_capturer] |= self.table
+                    self.table = 0
+                self.status = "finished"
+                self.scores, _ = score_game(self.players, self.captured, self.escobas)
+        
+        return True, result
+
+def match_view(public, player, hand, hints=None):
+    """What one player sees: public state plus their own hand, captured pile and legal plays
+
+    hints are the player's legal plays if the caller already has them for this state version.
+    """
+    return {
+        "match_id": public["match_id"],
+        "version": public["version"],
+        "players": public["players"],
+        "current_player": public["current_player"],
+        "your_hand": cards_of(hand),
+        "table_cards": cards_of(public["table"]),
+        "scores": public["scores"],
+        "escobas": public["escobas"],
+        "status": public["status"],
+        "remaining_deck": public["remaining_deck"],
+        "captured_cards": cards_of(public["captured"].get(player, 0)),
+        "legal_moves": move_hints(hand, public["table"]) if hints is None else hints
+    }
+
+def legacy_to_state(data):
+    """Legacy JSON match dict -> current attribute dict (used by the key migration)"""
+    return EscobaGame.from_dict(data).to_dict()
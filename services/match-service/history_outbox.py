@@ -0,0 +1,145 @@
+"""Durable hand-off of finished matches to history-service.
+
+The final move XADDs the history record to the history:outbox stream in the
+same MULTI that stores the final state, so a match is either still playable
+or queued for history, never lost in between. A background worker reads the
+stream through a consumer group, posts records to history-service in batches
+and acknowledges them only once history answered. history-service ignores
+match_ids it already has, so redelivering after a crash is safe.
+"""
+import json
+import socket
+import threading
+import time
+
+import redis
+import requests
+
+OUTBOX_STREAM = 'history:outbox'
+DEAD_LETTER_STREAM = 'history:outbox:dead'
+CONSUMER_GROUP = 'history-delivery'
+
+def enqueue(pipe, record):
+    """Queue a history record; call inside the MULTI that stores the final state"""
+    pipe.xadd(OUTBOX_STREAM, {'match_id': record['match_id'], 'record': json.dumps(record)})
+
+class HistoryOutbox:
+    def __init__(self, redis_client, history_url, batch_size=50, block_ms=2000, timeout=5,
+                 claim_idle_ms=60000, max_backoff=30, consumer=None):
+        self.redis = redis_client
+        self.history_url = history_url
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.timeout = timeout
+        self.claim_idle_ms = claim_idle_ms
+        self.max_backoff = max_backoff
+        self.consumer = consumer or socket.gethostname()
+        self.session = requests.Session()
+        self.counters = {"delivered": 0, "duplicates": 0, "rejected": 0, "batches": 0, "failed_batches": 0}
+        self.lock = threading.Lock()
+        self.running = False
+        self.last_error = None
+
+    def ensure_group(self):
+        try:
+            # id 0: records queued before the group existed are delivered too
+            self.redis.xgroup_create(OUTBOX_STREAM, CONSUMER_GROUP, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def claim_stale(self):
+        """Take over records left pending by consumers that went away (e.g. a recreated container)"""
+        claimed = self.redis.xautoclaim(OUTBOX_STREAM, CONSUMER_GROUP, self.consumer, self.claim_idle_ms,
+                                        start_id='0-0', count=self.batch_size, justid=True)
+        return len(claimed)
+
+    def read(self, pending):
+        """Own pending records first (a failed batch is retried before anything new), then new ones"""
+        streams = {OUTBOX_STREAM: '0' if pending else '>'}
+        response = self.redis.xreadgroup(CONSUMER_GROUP, self.consumer, streams,
+                                         count=self.batch_size, block=None if pending else self.block_ms)
+        return response[0][1] if response else []
+
+    def deliver(self, entries):
+        """Post one batch and ack it once history settled every record (saved, duplicate, invalid or failed)"""
+        records = {}
+        for entry_id, fields in entries:
+            if fields:
+                records[entry_id] = json.loads(fields[b'record'])
+        results = []
+        if records:
+            response = self.session.post(f"{self.history_url}/history/matches/batch",
+                                         json={"matches": list(records.values())}, timeout=self.timeout)
+            if response.status_code != 200:
+                raise requests.HTTPError(f"history-service answered {response.status_code}")
+            # One result per record, in order
+            results = response.json()['results']
+            if len(results) != len(records):
+                raise ValueError(f"history-service returned {len(results)} results for {len(records)} matches")
+
+        with self.redis.pipeline() as pipe:
+            for record, result in zip(records.values(), results):
+                if result['status'] in ('invalid', 'failed'):
+                    # Only the records history refused go aside for inspection; the rest of the batch is stored
+                    errors = result.get('errors') or [result.get('error', 'unknown error')]
+                    pipe.xadd(DEAD_LETTER_STREAM, {'match_id': record['match_id'], 'record': json.dumps(record),
+                                                   'status': result['status'], 'errors': json.dumps(errors)})
+                self.count({"saved": "delivered", "duplicate": "duplicates"}.get(result['status'], "rejected"))
+            ids = [entry_id for entry_id, _ in entries]
+            pipe.xack(OUTBOX_STREAM, CONSUMER_GROUP, *ids)
+            pipe.xdel(OUTBOX_STREAM, *ids)
+            pipe.execute()
+        self.count("batches")
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.counters[key] += amount
+
+    def run(self):
+        self.running = True
+        backoff = 0
+        pending = True
+        last_claim = 0
+        while self.running:
+            try:
+                if backoff:
+                    time.sleep(backoff)
+                if time.time() - last_claim > self.claim_idle_ms / 1000:
+                    self.ensure_group()
+                    if self.claim_stale():
+                        pending = True
+                    last_claim = time.time()
+                entries = self.read(pending)
+                if not entries:
+                    pending = False
+                    continue
+                self.deliver(entries)
+                backoff = 0
+            except (requests.RequestException, redis.RedisError, ValueError, KeyError) as e:
+                self.count("failed_batches")
+                self.last_error = str(e)
+                pending = True
+                backoff = min(self.max_backoff, backoff * 2 or 0.5)
+                print(f"⚠️  History delivery failed, retrying in {backoff}s: {e}")
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name='history-outbox', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        try:
+            stats["queued"] = self.redis.xlen(OUTBOX_STREAM)
+            stats["pending"] = self.redis.xpending(OUTBOX_STREAM, CONSUMER_GROUP)['pending']
+            stats["dead_letters"] = self.redis.xlen(DEAD_LETTER_STREAM)
+        except redis.ResponseError:
+            # No consumer group yet: nothing has been delivered
+            stats["pending"] = 0
+        stats["last_error"] = self.last_error
+        return stats
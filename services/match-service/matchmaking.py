@@ -0,0 +1,171 @@
+"""Matchmaking queue on a Redis sorted set scored by player level.
+
+    matchmaking:queue           zset, member = player, score = level (player-service player_stats)
+    matchmaking:joined          hash, player -> time they joined the queue
+    matchmaking:match:<player>  match id a queued player was paired into (expires after result_ttl)
+
+Pairing runs in a Lua script, so two players polling at once can never take
+the same opponent: it looks at the closest queued players just below and
+just above the player's level (two ZRANGEBYSCORE ... LIMIT 0 2 calls, so
+O(log n) whatever the queue length) and takes the nearest one inside the
+player's window. The window starts at window_base levels and grows by
+window_growth levels per second of waiting, up to window_max, so nobody
+waits forever for an exact match.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+QUEUE_KEY = 'matchmaking:queue'
+JOINED_KEY = 'matchmaking:joined'
+
+def result_key(player):
+    return f"matchmaking:match:{player}"
+
+# KEYS: queue, joined hash. ARGV: player, window (levels). Returns the opponent or nil.
+PAIR_SCRIPT = """
+local level = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not level then
+    return false
+end
+level = tonumber(level)
+local window = tonumber(ARGV[2])
+local best, best_gap
+local function consider(candidates)
+    for i = 1, #candidates, 2 do
+        if candidates[i] ~= ARGV[1] then
+            local gap = math.abs(tonumber(candidates[i + 1]) - level)
+            if not best_gap or gap < best_gap then
+                best, best_gap = candidates[i], gap
+            end
+        end
+    end
+end
+consider(redis.call('ZREVRANGEBYSCORE', KEYS[1], level, level - window, 'WITHSCORES', 'LIMIT', 0, 2))
+consider(redis.call('ZRANGEBYSCORE', KEYS[1], level, level + window, 'WITHSCORES', 'LIMIT', 0, 2))
+if not best then
+    return false
+end
+redis.call('ZREM', KEYS[1], ARGV[1], best)
+redis.call('HDEL', KEYS[2], ARGV[1], best)
+return best
+"""
+
+class LevelCache:
+    """Player levels for ttl seconds, at most max_size of them (oldest dropped first)
+
+    Every entry lives for the same ttl, so insertion order is expiry order:
+    expired entries are trimmed from the front on each put.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()  # player -> (level, expires at)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, player):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(player)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self.entries[player]
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, player, level):
+        now = time.monotonic()
+        with self.lock:
+            self.entries.pop(player, None)
+            self.entries[player] = (level, now + self.ttl)
+            while self.entries and (len(self.entries) > self.max_size or next(iter(self.entries.values()))[1] <= now):
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+class Matchmaker:
+    def __init__(self, redis_client, level_of, window_base=1, window_growth=0.1, window_max=10, result_ttl=300):
+        """level_of(player) -> level used as the queue score"""
+        self.redis = redis_client
+        self.level_of = level_of
+        self.window_base = window_base
+        self.window_growth = window_growth
+        self.window_max = window_max
+        self.result_ttl = result_ttl
+        self.pair_script = redis_client.register_script(PAIR_SCRIPT)
+        self.counters = {"joined": 0, "paired": 0, "left": 0}
+        self.lock = threading.Lock()
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.counters[key] += amount
+
+    def window(self, waited):
+        return min(self.window_max, self.window_base + self.window_growth * waited)
+
+    def join(self, player, level=None):
+        """Queue a player (again: keeps their place) and try to pair them -> (level, opponent or None)"""
+        level = self.level_of(player) if level is None else level
+        with self.redis.pipeline() as pipe:
+            pipe.zadd(QUEUE_KEY, {player: level})
+            pipe.hsetnx(JOINED_KEY, player, time.time())
+            pipe.delete(result_key(player))
+            pipe.hget(JOINED_KEY, player)
+            joined = pipe.execute()[-1]
+        self.count("joined")
+        return level, self.pair(player, joined=joined)
+
+    def pair(self, player, now=None, joined=None):
+        """Take the closest opponent inside the player's current window, or None"""
+        if joined is None:
+            joined = self.redis.hget(JOINED_KEY, player)
+        if joined is None:
+            return None
+        waited = max(0.0, (now or time.time()) - float(joined))
+        opponent = self.pair_script(keys=[QUEUE_KEY, JOINED_KEY], args=[player, self.window(waited)])
+        if opponent is None:
+            return None
+        self.count("paired")
+        return opponent.decode('utf-8') if isinstance(opponent, bytes) else opponent
+
+    def record_match(self, pipe, players, match_id):
+        """Tell both players where they were paired; call in the pipeline that stores the match"""
+        for player in players:
+            pipe.set(result_key(player), match_id, ex=self.result_ttl)
+
+    def status(self, player, now=None):
+        """Where a player stands: matched (with match_id), waiting or not queued"""
+        match_id = self.redis.get(result_key(player))
+        if match_id:
+            return {"status": "matched", "match_id": match_id.decode('utf-8')}
+        with self.redis.pipeline() as pipe:
+            pipe.zscore(QUEUE_KEY, player)
+            pipe.hget(JOINED_KEY, player)
+            level, joined = pipe.execute()
+        if level is None:
+            return {"status": "not_queued"}
+        waited = max(0.0, (now or time.time()) - float(joined or 0))
+        return {"status": "waiting", "level": int(level), "waited": round(waited, 1),
+                "window": round(self.window(waited), 2)}
+
+    def leave(self, player):
+        with self.redis.pipeline() as pipe:
+            pipe.zrem(QUEUE_KEY, player)
+            pipe.hdel(JOINED_KEY, player)
+            removed, _ = pipe.execute()
+        if removed:
+            self.count("left")
+        return bool(removed)
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats["queued"] = self.redis.zcard(QUEUE_KEY)
+        return stats
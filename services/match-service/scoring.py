@@ -0,0 +1,86 @@
+"""End-of-game La Escoba scoring, vectorised over a card-attribute table.
+
+One point each for: most cards, most oros, the 7 de Oros, the best primera
+(setenta), plus one point per escoba. Ties on a "most" category give nobody
+the point. Everything is computed as array counts over a (games, 2 players,
+4 suits, 10 ranks) boolean tensor, so scoring one game and re-scoring a
+batch of stored games use the same code path.
+"""
+import numpy as np
+
+from rules import DECK_SIZE
+
+SUIT_COUNT = 4
+RANKS_PER_SUIT = 10
+
+# Primera value per rank position inside a suit (1-7, Sota, Caballo, Rey)
+PRIMERA_VALUES = np.array([16, 12, 13, 14, 15, 18, 21, 10, 10, 10], dtype=np.int16)
+OROS_SUIT = 0
+SEVEN_RANK = 6
+
+_BIT_SHIFTS = np.arange(DECK_SIZE, dtype=np.uint64)
+
+def piles_to_tensor(piles):
+    """[(pile_player1, pile_player2), ...] -> bool array (games, 2, 4, 10)
+
+    A pile is either a list of card ids or a 40-bit card mask.
+    """
+    games = len(piles)
+    if all(isinstance(pile, (int, np.integer)) for pair in piles for pile in pair):
+        masks = np.array(piles, dtype=np.uint64).reshape(games, 2, 1)
+        tensor = ((masks >> _BIT_SHIFTS) & np.uint64(1)).astype(bool)
+        return tensor.reshape(games, 2, SUIT_COUNT, RANKS_PER_SUIT)
+
+    tensor = np.zeros((games, 2, DECK_SIZE), dtype=bool)
+    for g, pair in enumerate(piles):
+        for p, pile in enumerate(pair):
+            if isinstance(pile, (int, np.integer)):
+                tensor[g, p] = (np.uint64(pile) >> _BIT_SHIFTS) & np.uint64(1)
+            elif len(pile):
+                tensor[g, p, np.asarray(pile, dtype=np.intp) - 1] = True
+    return tensor.reshape(games, 2, SUIT_COUNT, RANKS_PER_SUIT)
+
+def _most(values):
+    """One point to the player with the strictly larger value"""
+    return np.stack([values[:, 0] > values[:, 1], values[:, 1] > values[:, 0]], axis=1).astype(np.int16)
+
+def score_batch(piles, escobas):
+    """Score many finished games at once.
+
+    piles: [(pile_player1, pile_player2), ...], escobas: [(n1, n2), ...]
+    Returns (points (games, 2), breakdown dict of (games, 2) arrays).
+    """
+    cards = piles_to_tensor(piles)
+    card_counts = cards.sum(axis=(2, 3))
+    oros_counts = cards[:, :, OROS_SUIT, :].sum(axis=2)
+    seven_of_oros = cards[:, :, OROS_SUIT, SEVEN_RANK].astype(np.int16)
+    primera = (cards * PRIMERA_VALUES).max(axis=3).sum(axis=2)
+    escoba_points = np.asarray(escobas, dtype=np.int16).reshape(len(piles), 2)
+
+    breakdown = {
+        "cards": _most(card_counts),
+        "oros": _most(oros_counts),
+        "seven_of_oros": seven_of_oros,
+        "primera": _most(primera),
+        "escobas": escoba_points,
+    }
+    points = sum(breakdown.values())
+    return points, breakdown
+
+def score_game(players, captured, escobas):
+    """Score one game: {player: pile} and {player: escobas} -> ({player: points}, {player: breakdown})"""
+    points, breakdown = score_batch(
+        [(captured[players[0]], captured[players[1]])],
+        [(escobas.get(players[0], 0), escobas.get(players[1], 0))],
+    )
+    scores = {player: int(points[0, i]) for i, player in enumerate(players)}
+    details = {
+        player: {category: int(values[0, i]) for category, values in breakdown.items()}
+        for i, player in enumerate(players)
+    }
+    return scores, details
+
+def winner(players, scores):
+    if scores[players[0]] == scores[players[1]]:
+        return "draw"
+    return max(players, key=lambda player: scores[player])
@@ -0,0 +1,186 @@
+"""Headless La Escoba simulator.
+
+Plays full games between two policies with the match-service engine
+(engine.py, rules.py masks, scoring.py), no HTTP and no Redis. Games are
+split in batches over a process pool; game N is always dealt from
+a random.Random seeded from (seed, N), so a run gives the same results whatever the
+number of workers and can be used as a regression benchmark for the engine.
+
+A policy is a function (game, player, rng) -> (card_id, capture) where
+capture is a list of table card ids, or None to let the engine pick the
+best capture. Built-in policies are listed in POLICIES; any other one can be
+named as "module:function".
+
+    python simulator.py --games 1000000 --workers 8 --policies greedy random
+    python simulator.py --games 20000 --profile      # allocation profile (much slower)
+"""
+import gc
+import importlib
+import os
+import random
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import EscobaGame
+from rules import cards_of, legal_moves, capture_value, CARD_POINTS
+from scoring import winner
+
+SEAT_NAMES = ('p0', 'p1')
+GAME_SEED_STRIDE = 1 << 32
+PROFILE_TOP = 10
+
+# --- Policies ---
+
+def random_policy(game, player, rng):
+    """Any card; a random capture when the card has some"""
+    card_id, options = rng.choice(legal_moves(game.hands[player], game.table))
+    return card_id, cards_of(rng.choice(options)) if options else []
+
+def first_card_policy(game, player, rng):
+    """Lowest card id, engine's automatic capture (what a client sending only card_id gets)"""
+    return cards_of(game.hands[player])[0], None
+
+def greedy_policy(game, player, rng):
+    """Best immediate capture (escoba, 7 de Oros, most cards, most oros); otherwise lay down the lowest card"""
+    table = game.table
+    best = None
+    for card_id, options in legal_moves(game.hands[player], table):
+        for option in options:
+            value = capture_value(option, table)
+            if best is None or value > best[0]:
+                best = (value, card_id, option)
+    if best:
+        return best[1], cards_of(best[2])
+    return min(cards_of(game.hands[player]), key=lambda card_id: CARD_POINTS[card_id]), []
+
+POLICIES = {
+    'random': random_policy,
+    'first': first_card_policy,
+    'greedy': greedy_policy,
+}
+
+def resolve_policy(name):
+    if name in POLICIES:
+        return POLICIES[name]
+    module_name, _, function_name = name.partition(':')
+    if not function_name:
+        raise ValueError(f"Unknown policy {name!r}: use one of {sorted(POLICIES)} or module:function")
+    return getattr(importlib.import_module(module_name), function_name)
+
+# --- Games ---
+
+def play_game(policies, rng, match_id='sim'):
+    """Play one game to the end; policies[i] sits in SEAT_NAMES[i]"""
+    game = EscobaGame(match_id, SEAT_NAMES[0], SEAT_NAMES[1], rng=rng)
+    by_player = dict(zip(SEAT_NAMES, policies))
+    while game.status == "active":
+        player = game.current_player
+        card_id, capture = by_player[player](game, player, rng)
+        ok, message = game.play_card(player, card_id, capture)
+        if not ok:
+            raise RuntimeError(f"Policy for {player} made an illegal move ({card_id}, {capture}): {message}")
+    return game
+
+def run_batch(policy_names, seed, first_game, count, profile=False):
+    """Worker: play games first_game..first_game+count-1, return counters (and an allocation profile)"""
+    policies = [resolve_policy(name) for name in policy_names]
+    stats = {"games": 0, "moves": 0, "wins": [0, 0], "draws": 0, "escobas": [0, 0], "points": [0, 0]}
+    if profile:
+        tracemalloc.start()
+    collections = sum(s['collections'] for s in gc.get_stats())
+    start = time.perf_counter()
+    game = None
+    for index in range(first_game, first_game + count):
+        rng = random.Random(seed * GAME_SEED_STRIDE + index)
+        # Alternate who leads so neither policy always plays first
+        order = (0, 1) if index % 2 == 0 else (1, 0)
+        game = play_game([policies[i] for i in order], rng)
+        stats["games"] += 1
+        stats["moves"] += game.version
+        result = winner(game.players, game.scores)
+        if result == "draw":
+            stats["draws"] += 1
+        else:
+            stats["wins"][order[SEAT_NAMES.index(result)]] += 1
+        for seat, policy_index in enumerate(order):
+            stats["escobas"][policy_index] += game.escobas[SEAT_NAMES[seat]]
+            stats["points"][policy_index] += game.scores[SEAT_NAMES[seat]]
+    stats["cpu_seconds"] = time.perf_counter() - start
+    stats["gc_collections"] = sum(s['collections'] for s in gc.get_stats()) - collections
+    if profile:
+        # Snapshot while the last game is still alive: its move log plus whatever the engine keeps (caches)
+        snapshot = tracemalloc.take_snapshot()
+        stats["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        stats["allocations"] = [
+            (f"{os.path.basename(s.traceback[0].filename)}:{s.traceback[0].lineno}", s.size, s.count)
+            for s in snapshot.statistics('lineno')[:PROFILE_TOP]
+        ]
+    del game
+    return stats
+
+def merge(results):
+    total = {"games": 0, "moves": 0, "wins": [0, 0], "draws": 0, "escobas": [0, 0], "points": [0, 0],
+             "cpu_seconds": 0.0, "gc_collections": 0}
+    allocations = {}
+    for stats in results:
+        for key in ("games", "moves", "draws", "cpu_seconds", "gc_collections"):
+            total[key] += stats[key]
+        for key in ("wins", "escobas", "points"):
+            total[key] = [a + b for a, b in zip(total[key], stats[key])]
+        if "peak_bytes" in stats:
+            total["peak_bytes"] = max(total.get("peak_bytes", 0), stats["peak_bytes"])
+            for site, size, count in stats["allocations"]:
+                previous = allocations.get(site, (0, 0))
+                allocations[site] = (previous[0] + size, previous[1] + count)
+    if allocations:
+        total["allocations"] = sorted(((site, size, count) for site, (size, count) in allocations.items()),
+                                      key=lambda entry: entry[1], reverse=True)[:PROFILE_TOP]
+    return total
+
+def simulate(games, policies=('greedy', 'random'), workers=None, seed=0, batch_size=500, profile=False):
+    """Play `games` games over a process pool (workers=1 runs in-process); returns merged counters and rates"""
+    batches = [(list(policies), seed, first, min(batch_size, games - first), profile)
+               for first in range(0, games, batch_size)]
+    start = time.perf_counter()
+    if workers == 1:
+        results = [run_batch(*batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_batch, *zip(*batches)))
+    total = merge(results)
+    total["wall_seconds"] = time.perf_counter() - start
+    total["games_per_sec"] = total["games"] / total["wall_seconds"]
+    total["moves_per_sec"] = total["moves"] / total["wall_seconds"]
+    total["policies"] = list(policies)
+    return total
+
+def print_report(report):
+    games = max(1, report["games"])
+    names = report["policies"]
+    print(f"🎴 {report['games']} games, {report['moves']} moves in {report['wall_seconds']:.2f}s "
+          f"(CPU {report['cpu_seconds']:.2f}s)")
+    print(f"  games/sec: {report['games_per_sec']:,.0f}   moves/sec: {report['moves_per_sec']:,.0f}   "
+          f"µs/game (CPU): {report['cpu_seconds'] / games * 1e6:.1f}")
+    for i, name in enumerate(names):
+        print(f"  {name:<12} wins {report['wins'][i] / games:6.1%}   "
+              f"avg points {report['points'][i] / games:.2f}   escobas/game {report['escobas'][i] / games:.2f}")
+    print(f"  draws {report['draws'] / games:.1%}   gc collections: {report['gc_collections']}")
+    if "allocations" in report:
+        print(f"  peak traced memory per worker: {report['peak_bytes'] / 1024:.1f} KiB")
+        for site, size, count in report["allocations"]:
+            print(f"    {site:<28} {size / 1024:9.1f} KiB {count:8d} blocks")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Headless La Escoba simulator")
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--policies', nargs=2, default=['greedy', 'random'], metavar=('POLICY_A', 'POLICY_B'))
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: one per CPU)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=500, help="games per pool task")
+    parser.add_argument('--profile', action='store_true', help="tracemalloc allocation profile per worker")
+    args = parser.parse_args()
+    print_report(simulate(args.games, args.policies, args.workers, args.seed, args.batch_size, args.profile))
@@ -0,0 +1,271 @@
+"""Compact, versioned binary encoding of match state for Redis.
+
+A match is stored as a hash, so a view reads only the fields it needs and a
+move appends to its log instead of rewriting it:
+
+    match:<id>          hash
+        public          format u8 | state version u32 | status u8 | current player u8 |
+                        last capturer u8 (255 = none) | table mask 5B | deck size u8
+                        2 x (captured mask 5B | escobas u8 | score u8)
+                        match_id, player1, player2 as u8 length + utf-8
+        hand:<player>   hand mask 5B
+        deck            one byte per card id
+        hints:<player>  state version u32 | that player's legal plays as JSON, written by
+                        the first view of a version and deleted by every move
+    match:<id>:moves    list, one entry per move:
+                        player u8 | card u8 | captured mask 5B | result u8 | timestamp f64
+
+Every committed move is published on match:<id>:events as both hands
+(2 x 5B, in player order) followed by the public field, so stream subscribers
+on any instance can build their player's view without reading Redis.
+
+Matches stored before the hash layout are single string keys holding a JSON
+object. Run `python state_codec.py --migrate` (also done at service startup)
+to move those keys to the hash layout.
+"""
+import json
+import struct
+
+from rules import mask_of, cards_of
+
+FIELDS_FORMAT = 3
+MASK_BYTES = 5
+NO_PLAYER = 255
+# Strings carry a u8 length prefix
+MAX_STRING_BYTES = 255
+
+# A stored match is active or finished; abandoned ones are archived to history and deleted
+STATUSES = ('active', 'finished')
+MOVE_RESULTS = ('drop', 'capture', 'escoba')
+
+MOVE = struct.Struct('<BB5sBd')
+HINTS_VERSION = struct.Struct('<I')
+PUBLIC = struct.Struct('<BIBBB5sB')
+PUBLIC_PLAYER = struct.Struct('<5sBB')
+
+PUBLIC_FIELD = b'public'
+DECK_FIELD = b'deck'
+
+def match_key(match_id):
+    return f"match:{match_id}"
+
+def moves_key(match_id):
+    return f"match:{match_id}:moves"
+
+def events_channel(match_id):
+    return f"match:{match_id}:events"
+
+def hand_field(player):
+    return f"hand:{player}".encode('utf-8')
+
+def hints_field(player):
+    return f"hints:{player}".encode('utf-8')
+
+def _mask_bytes(mask):
+    return mask.to_bytes(MASK_BYTES, 'little')
+
+def _mask(raw):
+    return int.from_bytes(raw, 'little')
+
+def fits_string(value):
+    """True for a non-empty str whose UTF-8 form fits the u8 length prefix"""
+    return isinstance(value, str) and 0 < len(value.encode('utf-8')) <= MAX_STRING_BYTES
+
+def _string(value):
+    raw = value.encode('utf-8')
+    return bytes((len(raw),)) + raw
+
+def _read_string(raw, offset):
+    length = raw[offset]
+    return raw[offset + 1:offset + 1 + length].decode('utf-8'), offset + 1 + length
+
+def _header_indexes(state, index):
+    return (
+        STATUSES.index(state['status']),
+        index[state['current_player']],
+        index.get(state['last_capturer'], NO_PLAYER),
+    )
+
+# --- Moves ---
+
+def encode_move(move, players):
+    return MOVE.pack(players.index(move['player']), move['card_played'], _mask_bytes(mask_of(move['captured_cards'])),
+                     MOVE_RESULTS.index(move['result']), move['timestamp'])
+
+def decode_moves(raw, players):
+    """Concatenated move records -> move dicts"""
+    return [
+        {
+            "player": players[player_index],
+            "card_played": card,
+            "captured_cards": cards_of(_mask(captured)),
+            "result": MOVE_RESULTS[result],
+            "timestamp": timestamp,
+        }
+        for player_index, card, captured, result, timestamp in MOVE.iter_unpack(raw)
+    ]
+
+# --- Hash layout ---
+
+def encode_public(state):
+    """Everything a player view needs except the player's own hand"""
+    players = state['players']
+    index = {player: i for i, player in enumerate(players)}
+    parts = [PUBLIC.pack(FIELDS_FORMAT, state['version'], *_header_indexes(state, index),
+                         _mask_bytes(state['table']), len(state['deck']))]
+    for player in players:
+        parts.append(PUBLIC_PLAYER.pack(_mask_bytes(state['captured'][player]),
+                                        state['escobas'][player], state['scores'][player]))
+    parts.append(_string(state['match_id']))
+    parts.extend(_string(player) for player in players)
+    return b''.join(parts)
+
+def decode_public(raw):
+    if raw[0] != FIELDS_FORMAT:
+        raise ValueError(f"Unsupported match state format {raw[0]}")
+    _, version, status, current, last_capturer, table, deck_size = PUBLIC.unpack_from(raw, 0)
+    offset = PUBLIC.size
+    player_fields = []
+    for _ in range(2):
+        player_fields.append(PUBLIC_PLAYER.unpack_from(raw, offset))
+        offset += PUBLIC_PLAYER.size
+    match_id, offset = _read_string(raw, offset)
+    player1, offset = _read_string(raw, offset)
+    player2, offset = _read_string(raw, offset)
+    players = [player1, player2]
+    return {
+        "version": version,
+        "match_id": match_id,
+        "players": players,
+        "current_player": players[current],
+        "table": _mask(table),
+        "captured": {p: _mask(f[0]) for p, f in zip(players, player_fields)},
+        "escobas": {p: f[1] for p, f in zip(players, player_fields)},
+        "last_capturer": players[last_capturer] if last_capturer != NO_PLAYER else None,
+        "scores": {p: f[2] for p, f in zip(players, player_fields)},
+        "status": STATUSES[status],
+        "remaining_deck": deck_size,
+    }
+
+def encode_fields(state):
+    """EscobaGame attribute dict -> {hash field: bytes} (the move log is stored separately)"""
+    fields = {PUBLIC_FIELD: encode_public(state), DECK_FIELD: bytes(state['deck'])}
+    for player in state['players']:
+        fields[hand_field(player)] = _mask_bytes(state['hands'][player])
+    return fields
+
+def decode_fields(fields):
+    """HGETALL result -> EscobaGame attribute dict with an empty moves_log"""
+    state = decode_public(fields[PUBLIC_FIELD])
+    del state['remaining_deck']
+    state['deck'] = list(fields[DECK_FIELD])
+    state['hands'] = {player: _mask(fields[hand_field(player)]) for player in state['players']}
+    state['moves_log'] = []
+    return state
+
+def decode_hand(raw):
+    return _mask(raw) if raw else 0
+
+def encode_hints(version, hints):
+    return HINTS_VERSION.pack(version) + json.dumps(hints, separators=(',', ':')).encode('utf-8')
+
+def decode_hints(raw, version):
+    """Cached legal plays, or None if there are none for this state version"""
+    if not raw or HINTS_VERSION.unpack_from(raw, 0)[0] != version:
+        return None
+    return json.loads(raw[HINTS_VERSION.size:])
+
+# Store hints only while the public field still holds the state version they were built for
+# (bytes 2-5, after the format byte), so a view racing a move never caches stale plays
+# and never recreates a match key the expiry sweeper just deleted.
+# ARGV: hints field, encoded hints
+STORE_HINTS_SCRIPT = """
+local public = redis.call('HGET', KEYS[1], 'public')
+if not public or string.sub(public, 2, 5) ~= string.sub(ARGV[2], 1, 4) then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+return 1
+"""
+
+def store_hints(redis_client, match_id, player, version, hints):
+    """Cache one player's legal plays for a state version; returns 1 if stored"""
+    return redis_client.eval(STORE_HINTS_SCRIPT, 1, match_key(match_id), hints_field(player),
+                             encode_hints(version, hints))
+
+def encode_update(state):
+    """Pub/sub payload for a committed move"""
+    hands = b''.join(_mask_bytes(state['hands'][player]) for player in state['players'])
+    return hands + encode_public(state)
+
+def decode_update(raw):
+    """-> (public dict, {player: hand mask})"""
+    public = decode_public(raw[2 * MASK_BYTES:])
+    hands = {player: _mask(raw[i * MASK_BYTES:(i + 1) * MASK_BYTES]) for i, player in enumerate(public['players'])}
+    return public, hands
+
+# --- Migration of single-key matches ---
+
+# Compare-and-set so a migration never overwrites a move written after it read the key.
+# ARGV: old value, number of hash fields, field/value pairs..., move records...
+MIGRATE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+local ttl = redis.call('PTTL', KEYS[1])
+redis.call('DEL', KEYS[1], KEYS[2])
+local last_field = 2 + tonumber(ARGV[2]) * 2
+for i = 3, last_field, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+for i = last_field + 1, #ARGV do
+    redis.call('RPUSH', KEYS[2], ARGV[i])
+end
+if ttl > 0 then
+    redis.call('PEXPIRE', KEYS[1], ttl)
+    if #ARGV > last_field then
+        redis.call('PEXPIRE', KEYS[2], ttl)
+    end
+end
+return 1
+"""
+
+def migrate_match(redis_client, key, from_legacy):
+    """Move one single-key JSON match to the hash layout; returns 1 if migrated"""
+    raw = redis_client.get(key)
+    if not raw:
+        return 0
+    state = from_legacy(json.loads(raw))
+    fields = encode_fields(state)
+    args = [raw, len(fields)]
+    for field, value in fields.items():
+        args.extend((field, value))
+    args.extend(encode_move(m, state['players']) for m in state['moves_log'])
+    return redis_client.eval(MIGRATE_SCRIPT, 2, key, moves_key(state['match_id']), *args)
+
+def migrate_legacy_matches(redis_client, from_legacy, batch_size=500):
+    """Move every single-key match:<id> value to the hash layout.
+
+    from_legacy turns a legacy JSON dict into a current attribute dict
+    (EscobaGame.from_dict(...).to_dict()); returns the number of keys migrated.
+    """
+    migrated = 0
+    for key in redis_client.scan_iter(match='match:*', count=batch_size):
+        if redis_client.type(key) in (b'string', 'string'):
+            migrated += migrate_match(redis_client, key, from_legacy)
+    return migrated
+
+if __name__ == '__main__':
+    import argparse
+    import os
+
+    import redis
+
+    parser = argparse.ArgumentParser(description="Match state codec tools")
+    parser.add_argument('--migrate', action='store_true', help="move single-key matches to the hash layout")
+    args = parser.parse_args()
+    if args.migrate:
+        from engine import legacy_to_state
+        client = redis.Redis(host=os.environ.get('REDIS_HOST', 'match-db'),
+                             port=int(os.environ.get('REDIS_PORT', 6379)), db=0)
+        print(f"✅ Migrated {migrate_legacy_matches(client, legacy_to_state)} match keys")
@@ -1,11 +1,15 @@
 from flask import Flask, request, jsonify
+from waitress import serve
 import uuid
 import os
 import psycopg2
+from db_pool import ConnectionPool
 import time
 from datetime import datetime
 from flask_cors import CORS
 import re
+import threading
+from collections import OrderedDict
 
 app = Flask(__name__)
 CORS(app)
@@ -34,21 +38,28 @@ def wait_for_db(max_retries=30, retry_interval=2):
                 print(f"❌ Failed to connect to database after {max_retries} attempts: {e}")
                 return False
 
+# Pooled connections (db_pool.py): conn.close() hands the connection back to the pool
+DB_POOL = ConnectionPool(
+    minconn=int(os.environ.get('DB_POOL_MIN', 2)),
+    maxconn=int(os.environ.get('DB_POOL_MAX', 20)),
+    checkout_timeout=float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+    host=os.environ.get('DB_HOST', 'player-db'),
+    database=os.environ.get('DB_NAME', 'player_db'),
+    user=os.environ.get('DB_USER', 'user'),
+    password=os.environ.get('DB_PASSWORD', 'password'),
+    port=os.environ.get('DB_PORT', '5432')
+)
+DB_POOL.init_app(app)
+
 def get_db_connection():
-    conn = psycopg2.connect(
-        host=os.environ.get('DB_HOST', 'player-db'),
-        database=os.environ.get('DB_NAME', 'player_db'),
-        user=os.environ.get('DB_USER', 'user'),
-        password=os.environ.get('DB_PASSWORD', 'password'),
-        port=os.environ.get('DB_PORT', '5432')
-    )
-    return conn
+    return DB_POOL.getconn()
 
 def init_db():
     """Initialize database tables"""
     if not wait_for_db():
         print("❌ Cannot initialize database - connection failed")
         return False
+    DB_POOL.fill()
     
     conn = get_db_connection()
     cur = conn.cursor()
@@ -91,39 +102,59 @@ def init_db():
         cur.close()
         conn.close()
 
-def ensure_player_exists(username, email=None):
-    """Insert player and stats if not exist (idempotent)"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    try:
-        # Check if player exists
-        cur.execute('SELECT username FROM players WHERE username = %s', (username,))
-        if not cur.fetchone():
-            cur.execute(
-                'INSERT INTO players (username, player_id, email) VALUES (%s, %s, %s)',
-                (username, str(uuid.uuid4()), email)
-            )
-            print(f"✅ Created player record for {username}")
-    
-        # Check if stats exist
-        cur.execute('SELECT username FROM player_stats WHERE username = %s', (username,))
-        if not cur.fetchone():
-            cur.execute(
-                '''INSERT INTO player_stats (username, total_score, level, matches_played, matches_won, matches_lost, win_rate)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)''',
-                (username, 0, 1, 0, 0, 0, 0.0)
-            )
-            print(f"✅ Created stats record for {username}")
-    
-        conn.commit()
-        
-    except Exception as e:
-        print(f"❌ Error ensuring player exists: {e}")
-        conn.rollback()
-    finally:
-        cur.close()
-        conn.close()
+# Players whose rows were seen recently (username -> expiry, least recently seen first):
+# their requests skip the upserts. Bounded by KNOWN_PLAYERS_MAX, shared by the request threads.
+KNOWN_PLAYERS = OrderedDict()
+KNOWN_PLAYERS_LOCK = threading.Lock()
+KNOWN_PLAYERS_TTL = float(os.environ.get('KNOWN_PLAYERS_TTL', 300))
+KNOWN_PLAYERS_MAX = int(os.environ.get('KNOWN_PLAYERS_MAX', 10000))
+
+ENSURE_PLAYER_SQL = '''
+    INSERT INTO players (username, player_id, email)
+    VALUES (%(username)s, %(player_id)s, %(email)s)
+    ON CONFLICT (username) DO NOTHING;
+    INSERT INTO player_stats (username, total_score, level, matches_played, matches_won, matches_lost, win_rate)
+    VALUES (%(username)s, 0, 1, 0, 0, 0, 0.0)
+    ON CONFLICT (username) DO NOTHING;
+'''
+
+def is_known_player(username):
+    with KNOWN_PLAYERS_LOCK:
+        expiry = KNOWN_PLAYERS.get(username)
+        if expiry is None:
+            return False
+        if expiry <= time.monotonic():
+            del KNOWN_PLAYERS[username]
+            return False
+        return True
+
+def remember_player(username):
+    with KNOWN_PLAYERS_LOCK:
+        KNOWN_PLAYERS[username] = time.monotonic() + KNOWN_PLAYERS_TTL
+        KNOWN_PLAYERS.move_to_end(username)
+        while len(KNOWN_PLAYERS) > KNOWN_PLAYERS_MAX:
+            KNOWN_PLAYERS.popitem(last=False)
+
+def forget_player(username):
+    """The row was not there after all (e.g. the database was reset): upsert on the next request"""
+    with KNOWN_PLAYERS_LOCK:
+        KNOWN_PLAYERS.pop(username, None)
+
+def run_with_player_upsert(cur, username, query, params=None, email=None):
+    """Run query on cur, creating the player and stats rows first if they do not exist (idempotent).
+
+    The upserts go out in the same execute() as query (one round trip, same
+    transaction), so the caller must commit. query takes %(name)s parameters,
+    with %(username)s always available. Players seen in the last
+    KNOWN_PLAYERS_TTL seconds skip the upserts. Returns True if they ran.
+    """
+    params = dict(params or {}, username=username)
+    if is_known_player(username):
+        cur.execute(query, params)
+        return False
+    params.update(player_id=str(uuid.uuid4()), email=email)
+    cur.execute(ENSURE_PLAYER_SQL + query, params)
+    return True
 
 def validate_username(username):
     """Validate username format"""
@@ -142,25 +173,29 @@ def get_player_profile(username):
         return jsonify({"error": "Invalid username format"}), 400
     
     try:
-        ensure_player_exists(username)
-        
         conn = get_db_connection()
         cur = conn.cursor()
         
         # Get player basic info
-        cur.execute('''
+        upserted = run_with_player_upsert(cur, username, '''
             SELECT p.player_id, p.email, p.created_at, 
                    ps.total_score, ps.level, ps.matches_played, 
                    ps.matches_won, ps.matches_lost, ps.win_rate,
                    ps.last_updated
             FROM players p
             LEFT JOIN player_stats ps ON p.username = ps.username
-            WHERE p.username = %s
-        ''', (username,))
+            WHERE p.username = %(username)s
+        ''')
         
         result = cur.fetchone()
+        if upserted:
+            conn.commit()
         cur.close()
         conn.close()
+        if result:
+            remember_player(username)
+        else:
+            forget_player(username)
         
         if not result:
             return jsonify({"error": "Player not found"}), 404
@@ -206,62 +241,52 @@ def update_player_stats(username):
         if not isinstance(score_delta, (int, float)):
             return jsonify({"error": "score_delta must be a number"}), 400
         
-        ensure_player_exists(username)
+        played = 0 if match_result == 'init' else 1  # 'init' is for player creation, don't count as match
         
         conn = get_db_connection()
         cur = conn.cursor()
         
-        # Get current stats
-        cur.execute('''
-            SELECT total_score, matches_played, matches_won, matches_lost 
-            FROM player_stats WHERE username = %s
-        ''', (username,))
+        # One atomic statement: the row lock serializes concurrent updates, so no increment is lost.
+        # SET expressions all see the old row; score never goes negative, level up every 1000 points.
+        run_with_player_upsert(cur, username, '''
+            UPDATE player_stats
+            SET matches_played = matches_played + %(played)s,
+                matches_won = matches_won + %(won)s,
+                matches_lost = matches_lost + %(lost)s,
+                total_score = GREATEST(0, total_score + ROUND(%(score_delta)s::numeric)),
+                level = 1 + FLOOR(GREATEST(0, total_score + ROUND(%(score_delta)s::numeric)) / 1000),
+                win_rate = CASE WHEN matches_played + %(played)s > 0
+                                THEN (matches_won + %(won)s)::numeric / (matches_played + %(played)s)
+                                ELSE 0 END,
+                last_updated = CURRENT_TIMESTAMP
+            WHERE username = %(username)s
+            RETURNING total_score, level, matches_played, matches_won, matches_lost, win_rate
+        ''', {
+            "played": played,
+            "won": int(match_result == 'win'),
+            "lost": int(match_result == 'loss'),
+            "score_delta": score_delta
+        })
         
         result = cur.fetchone()
         
         if not result:
+            forget_player(username)
             return jsonify({"error": "Player stats not found"}), 404
         
-        total_score, matches_played, matches_won, matches_lost = result
-        
-        # Update based on match result
-        if match_result != 'init':  # 'init' is for player creation, don't count as match
-            matches_played += 1
-            if match_result == 'win':
-                matches_won += 1
-            elif match_result == 'loss':
-                matches_lost += 1
-            # For 'draw', no change to wins/losses
-        
-        # Update score (ensure it doesn't go negative)
-        total_score = max(0, total_score + score_delta)
-        
-        # Calculate win rate
-        win_rate = (matches_won / matches_played) if matches_played > 0 else 0.0
-        
-        # Update level based on score (level up every 1000 points)
-        level = 1 + (total_score // 1000)
-        
-        # Update database
-        cur.execute('''
-            UPDATE player_stats 
-            SET total_score = %s, level = %s, matches_played = %s,
-                matches_won = %s, matches_lost = %s, win_rate = %s,
-                last_updated = CURRENT_TIMESTAMP
-            WHERE username = %s
-        ''', (total_score, level, matches_played, matches_won, matches_lost, win_rate, username))
-        
         conn.commit()
         cur.close()
         conn.close()
+        remember_player(username)
         
+        total_score, level, matches_played, matches_won, matches_lost, win_rate = result
         updated_stats = {
             "total_score": total_score,
             "level": level,
             "matches_played": matches_played,
             "matches_won": matches_won,
             "matches_lost": matches_lost,
-            "win_rate": round(win_rate, 4)
+            "win_rate": float(win_rate)
         }
         
         print(f"✅ Updated stats for {username}: {updated_stats}")
@@ -282,19 +307,23 @@ def get_player_stats(username):
         return jsonify({"error": "Invalid username format"}), 400
     
     try:
-        ensure_player_exists(username)
-        
         conn = get_db_connection()
         cur = conn.cursor()
         
-        cur.execute('''
+        upserted = run_with_player_upsert(cur, username, '''
             SELECT total_score, level, matches_played, matches_won, matches_lost, win_rate
-            FROM player_stats WHERE username = %s
-        ''', (username,))
+            FROM player_stats WHERE username = %(username)s
+        ''')
         
         result = cur.fetchone()
+        if upserted:
+            conn.commit()
         cur.close()
         conn.close()
+        if result:
+            remember_player(username)
+        else:
+            forget_player(username)
         
         if not result:
             return jsonify({"error": "Player stats not found"}), 404
@@ -365,12 +394,14 @@ def health():
         return jsonify({
             "status": "Player service is running",
             "database": "connected",
+            "database_pool": DB_POOL.stats(),
             "timestamp": datetime.now().isoformat()
         })
     except Exception as e:
         return jsonify({
             "status": "Player service is running",
             "database": "disconnected",
+            "database_pool": DB_POOL.stats(),
             "error": str(e)
         }), 503
 
@@ -379,6 +410,7 @@ if __name__ == '__main__':
     if init_db():
         print("✅ Player service starting on port 5004...")
         print("📊 Player profiles and statistics system ready")
-        app.run(host='0.0.0.0', port=5004, debug=False)
+        # waitress keeps the gateway's pooled connections open (app.run() closes each one)
+        serve(app, host='0.0.0.0', port=5004, threads=int(os.environ.get('WSGI_THREADS', 16)))
     else:
         print("❌ Failed to initialize database")
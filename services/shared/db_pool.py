@@ -0,0 +1,235 @@
+"""Thread-safe Postgres connection pool for the Flask services.
+
+Shared by auth-service, player-service and history-service: their images
+are built from the services/ directory and copy this file next to app.py.
+
+Connections are psycopg2 connections whose close() hands them back to the
+pool, so handlers keep the usual get_db_connection() / conn.close() shape.
+Anything a request forgets to close (an exception before conn.close()) is
+returned when its app context tears down. On checkout a connection is
+dropped and replaced if it is closed, broken, or fails a SELECT 1 after
+sitting idle for more than health_check_idle seconds. When every
+connection is busy, callers queue (first come, first served) for up to
+checkout_timeout; wait times are reported by stats().
+"""
+import collections
+import itertools
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+from flask import g, has_app_context
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection became free within checkout_timeout"""
+
+class PooledConnection(psycopg2.extensions.connection):
+    """close() returns the connection to its pool instead of closing it"""
+
+    pool = None
+    checked_out = False
+    checkout_id = None
+    owner = None
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        elif self.checked_out and self.owner == threading.get_ident():
+            # A second close() after the connection moved on to another thread is a no-op
+            self.pool.putconn(self)
+
+    def discard(self):
+        psycopg2.extensions.connection.close(self)
+
+class Waiter:
+    """A caller queued for a connection; handed one (or a free slot, conn None) in arrival order"""
+
+    __slots__ = ('event', 'conn', 'returned_at')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.conn = None
+        self.returned_at = 0.0
+
+class ConnectionPool:
+    def __init__(self, minconn=1, maxconn=10, checkout_timeout=5, health_check_idle=30, max_idle=300,
+                 **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.checkout_timeout = checkout_timeout
+        self.health_check_idle = health_check_idle
+        self.max_idle = max_idle
+        self.connect_kwargs = connect_kwargs
+        self.idle = collections.deque()  # (connection, returned at)
+        self.waiters = collections.deque()
+        self.opened = 0
+        self.lock = threading.Lock()
+        self.counters = {"checkouts": 0, "waits": 0, "timeouts": 0, "connects": 0, "discarded": 0}
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.connect_seconds = 0.0
+        self.checkout_ids = itertools.count(1)
+
+    def connect(self):
+        start = time.perf_counter()
+        conn = psycopg2.connect(connection_factory=PooledConnection, **self.connect_kwargs)
+        conn.pool = self
+        with self.lock:
+            self.counters["connects"] += 1
+            self.connect_seconds += time.perf_counter() - start
+        return conn
+
+    def fill(self):
+        """Open connections up to minconn (call once the database is reachable)"""
+        while True:
+            with self.lock:
+                if self.opened >= self.minconn:
+                    return
+                self.opened += 1
+            try:
+                conn = self.connect()
+            except psycopg2.Error:
+                self.release_slot()
+                raise
+            self.give(conn)
+
+    def give(self, conn):
+        """An idle connection goes to the longest waiting caller, else back to the idle stack"""
+        now = time.monotonic()
+        stale = []
+        with self.lock:
+            if self.waiters:
+                waiter = self.waiters.popleft()
+                waiter.conn, waiter.returned_at = conn, now
+                waiter.event.set()
+                return
+            self.idle.append((conn, now))
+            while len(self.idle) > self.minconn and now - self.idle[0][1] > self.max_idle:
+                stale.append(self.idle.popleft()[0])
+        for old in stale:
+            self.drop(old)
+
+    def release_slot(self):
+        """A connection was closed: let the next waiter open a new one, or shrink the pool"""
+        with self.lock:
+            if self.waiters:
+                self.waiters.popleft().event.set()
+            else:
+                self.opened -= 1
+
+    def healthy(self, conn, idle_for):
+        if conn.closed or conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if idle_for < self.health_check_idle:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Check out a healthy connection, opening one if the pool is below maxconn"""
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.checkout_timeout
+        waited = False
+        while True:
+            waiter = None
+            with self.lock:
+                if self.waiters or (not self.idle and self.opened >= self.maxconn):
+                    # First come, first served: no barging past callers already waiting
+                    waiter = Waiter()
+                    self.waiters.append(waiter)
+                elif self.idle:
+                    # Most recently used first: the rest can age out past max_idle
+                    conn, returned_at = self.idle.pop()
+                else:
+                    conn = None
+                    self.opened += 1
+
+            if waiter:
+                waited = True
+                if not waiter.event.wait(max(0.0, deadline - time.monotonic())):
+                    with self.lock:
+                        if not waiter.event.is_set():
+                            self.waiters.remove(waiter)
+                            self.counters["timeouts"] += 1
+                            raise PoolTimeout(f"No database connection free after {self.checkout_timeout}s "
+                                              f"({self.maxconn} in use)")
+                conn, returned_at = waiter.conn, waiter.returned_at
+
+            if conn is None:
+                try:
+                    conn = self.connect()
+                except psycopg2.Error:
+                    self.release_slot()
+                    raise
+            elif not self.healthy(conn, time.monotonic() - returned_at):
+                self.drop(conn)
+                continue
+            break
+
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.counters["checkouts"] += 1
+            if waited:
+                self.counters["waits"] += 1
+                self.wait_seconds += elapsed
+                self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+        conn.checked_out = True
+        conn.checkout_id = next(self.checkout_ids)
+        conn.owner = threading.get_ident()
+        if has_app_context():
+            g.setdefault('db_connections', []).append((conn, conn.checkout_id))
+        return conn
+
+    def putconn(self, conn):
+        conn.checked_out = False
+        if conn.closed:
+            self.drop(conn)
+            return
+        try:
+            if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                # Never hand the next request a half-finished transaction
+                conn.rollback()
+        except psycopg2.Error:
+            self.drop(conn)
+            return
+        self.give(conn)
+
+    def drop(self, conn):
+        try:
+            conn.discard()
+        except psycopg2.Error:
+            pass
+        with self.lock:
+            self.counters["discarded"] += 1
+        self.release_slot()
+
+    def release_request_connections(self, exception=None):
+        """teardown_appcontext hook: return whatever the request did not close"""
+        for conn, checkout_id in g.pop('db_connections', []):
+            # Closed ones may already serve another request under a new checkout
+            if conn.checked_out and conn.checkout_id == checkout_id:
+                conn.close()
+
+    def init_app(self, app):
+        app.teardown_appcontext(self.release_request_connections)
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats.update({
+                "size": self.opened,
+                "idle": len(self.idle),
+                "in_use": self.opened - len(self.idle),
+                "min": self.minconn,
+                "max": self.maxconn,
+                "avg_wait_ms": round(self.wait_seconds / stats["waits"] * 1000, 2) if stats["waits"] else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+                "avg_connect_ms": round(self.connect_seconds / stats["connects"] * 1000, 2) if stats["connects"] else 0.0,
+            })
+        return stats
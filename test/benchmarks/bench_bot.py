@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Bot decision benchmark
+Times match-service/bot.py choose_move at each strength level on positions taken
+from simulated games: decisions/sec, think time (avg / p95) and search iterations
+per decision, in-process and optionally split over a process pool. --games also
+plays each level against the greedy policy to show what the budget buys.
+
+    python test/benchmarks/bench_bot.py --positions 50
+    python test/benchmarks/bench_bot.py --positions 20 --workers 4 --games 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'match-service'))
+
+from engine import EscobaGame  # noqa: E402
+from bot import BOT_LEVELS, choose_move  # noqa: E402
+from simulator import greedy_policy, simulate, print_report  # noqa: E402
+
+def sample_positions(count, seed):
+    """Positions where the player to move has a real choice, from greedy vs greedy games"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = EscobaGame("bench-bot", "alice", "bob", rng=rng)
+        stop = rng.randrange(30)
+        while game.status == "active" and game.version < stop:
+            player = game.current_player
+            game.play_card(player, *greedy_policy(game, player, rng))
+        if game.status == "active":
+            player = game.current_player
+            positions.append((game.public_state(), player, game.hands[player]))
+    return positions
+
+def bench_level(level, positions, pool, workers):
+    timings, iterations = [], 0
+    for index, (public, player, hand) in enumerate(positions):
+        start = time.perf_counter()
+        _, _, info = choose_move(public, player, hand, level, pool=pool, workers=workers, seed=index)
+        timings.append(time.perf_counter() - start)
+        iterations += info["iterations"]
+    timings.sort()
+    total = sum(timings)
+    budget = BOT_LEVELS[level]
+    print(f"  {level:<7} budget {budget['time_ms']:4d} ms / {budget['nodes']:5d} nodes   "
+          f"{len(timings) / total:7.1f} decisions/s   avg {total / len(timings) * 1000:6.1f} ms   "
+          f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:6.1f} ms   "
+          f"{iterations / len(timings):7.0f} iterations/decision")
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot decision benchmark")
+    parser.add_argument('--positions', type=int, default=50, help="decisions timed per level")
+    parser.add_argument('--levels', nargs='+', default=list(BOT_LEVELS), choices=list(BOT_LEVELS))
+    parser.add_argument('--workers', type=int, default=0, help="also time root-parallel search on a process pool")
+    parser.add_argument('--games', type=int, default=0, help="games per level against the greedy policy")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    positions = sample_positions(args.positions, args.seed)
+    print(f"In-process, {len(positions)} positions")
+    for level in args.levels:
+        bench_level(level, positions, None, 1)
+
+    if args.workers > 1:
+        print(f"Process pool, {args.workers} workers")
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for level in args.levels:
+                bench_level(level, positions, pool, args.workers)
+
+    if args.games:
+        for level in args.levels:
+            print(f"Strength: {level} vs greedy")
+            print_report(simulate(args.games, (f"bot:{level}_policy", "greedy"), workers=args.workers or None,
+                                  seed=args.seed))
+
+if __name__ == '__main__':
+    main()
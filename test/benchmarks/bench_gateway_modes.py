@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Flask vs asyncio gateway benchmark
+Fires the same request mix at both gateway modes and reports requests/sec and latency percentiles.
+
+Start a second gateway in async mode next to the default one:
+    docker compose run -d -e GATEWAY_MODE=async -p 5010:5000 api-gateway
+then run:
+    python test/benchmarks/bench_gateway_modes.py --flask-url http://localhost:5000 --async-url http://localhost:5010
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run_load(base_url, path, total_requests, concurrency, token=None):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total_requests):
+        queue.put_nowait(None)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            while True:
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path, headers=headers)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total_requests,
+        "errors": errors,
+        "rps": total_requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Flask and asyncio gateway modes")
+    parser.add_argument("--flask-url", default="http://localhost:5000")
+    parser.add_argument("--async-url", default="http://localhost:5010")
+    parser.add_argument("--path", default="/cards/cards")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--token", help="Bearer token for authenticated paths")
+    args = parser.parse_args()
+
+    print(f"🐝 {args.requests} x GET {args.path} with {args.concurrency} concurrent clients")
+    for mode, url in (("flask", args.flask_url), ("async", args.async_url)):
+        # Warm up pools on both sides before measuring
+        asyncio.run(run_load(url, args.path, min(200, args.requests), min(20, args.concurrency), args.token))
+        result = asyncio.run(run_load(url, args.path, args.requests, args.concurrency, args.token))
+        print(f"{mode:>6}: {result['rps']:8.1f} req/s  p50 {result['p50_ms']:7.2f} ms  "
+              f"p99 {result['p99_ms']:7.2f} ms  errors {result['errors']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Match move contention benchmark
+Many clients hammer the same match(es) at once: each one reads the state and
+plays the current player's first card. Reports committed moves/sec, how
+requests ended, the WATCH conflict rate seen by match-service, and checks that
+no acknowledged move was lost (final version == moves acknowledged with 200).
+
+    python test/benchmarks/bench_match_contention.py --url http://localhost:5003 --clients 32 --matches 1
+    python test/benchmarks/bench_match_contention.py --expected-version   # clients send the version they read
+"""
+
+import argparse
+import threading
+import time
+from collections import Counter
+
+import requests
+
+def hammer(base_url, match_id, use_version, statuses, acknowledged, lock):
+    session = requests.Session()
+    while True:
+        state = session.get(f"{base_url}/match/{match_id}").json()
+        if state['status'] != 'active':
+            return
+        player = state['current_player']
+        hand = session.get(f"{base_url}/match/{match_id}", params={"player": player}).json()['your_hand']
+        if not hand:
+            continue
+        body = {"player": player, "card_id": hand[0]}
+        if use_version:
+            body["expected_version"] = state['version']
+        response = session.post(f"{base_url}/match/{match_id}/play", json=body)
+        with lock:
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                acknowledged[match_id] += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Match move contention benchmark")
+    parser.add_argument('--url', default='http://localhost:5003', help="match-service base URL")
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--matches', type=int, default=1, help="matches shared by all clients")
+    parser.add_argument('--expected-version', action='store_true', help="send expected_version with each move")
+    args = parser.parse_args()
+
+    before = requests.get(f"{args.url}/metrics").json()['moves']
+    match_ids = [
+        requests.post(f"{args.url}/match", json={"player1": f"bench_a{i}", "player2": f"bench_b{i}"}).json()['match_id']
+        for i in range(args.matches)
+    ]
+
+    statuses, acknowledged, lock = Counter(), Counter(), threading.Lock()
+    threads = [
+        threading.Thread(target=hammer, args=(args.url, match_ids[i % len(match_ids)], args.expected_version,
+                                              statuses, acknowledged, lock))
+        for i in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    after = requests.get(f"{args.url}/metrics").json()['moves']
+    committed = after['committed'] - before['committed']
+    conflicts = after['conflicts'] - before['conflicts']
+    lost = sum(acknowledged[m] - requests.get(f"{args.url}/match/{m}").json()['version'] for m in match_ids)
+
+    print(f"{args.clients} clients on {args.matches} match(es), expected_version={'on' if args.expected_version else 'off'}")
+    print(f"  duration:        {elapsed:.2f}s")
+    print(f"  committed moves: {committed} ({committed / elapsed:.1f}/s)")
+    print(f"  responses:       {dict(sorted(statuses.items()))}")
+    print(f"  WATCH conflicts: {conflicts} ({conflicts / max(1, committed + conflicts):.1%} of write attempts)")
+    print(f"  stale versions:  {after['stale_version'] - before['stale_version']}")
+    print(f"  gave up:         {after['gave_up'] - before['gave_up']}")
+    print(f"  lost moves:      {lost}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Match load micro-benchmark
+Per-request cost of turning a stored state back into an EscobaGame: the old
+path (deal a fresh game, then overwrite every field) against EscobaGame.from_state.
+
+    python test/benchmarks/bench_match_load.py --iterations 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'match-service'))
+
+from engine import EscobaGame  # noqa: E402
+from rules import cards_of  # noqa: E402
+from state_codec import encode_fields, decode_fields  # noqa: E402
+
+def redeal_then_overwrite(state):
+    """What from_dict used to do: shuffle and deal a new game, then replace all of it"""
+    game = EscobaGame(state["match_id"], state["players"][0], state["players"][1])
+    for name, value in state.items():
+        setattr(game, name, value)
+    return game
+
+def timed(label, fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<34} {elapsed / iterations * 1e6:8.2f} µs/op")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Match load micro-benchmark")
+    parser.add_argument('--moves', type=int, default=20, help="moves played before the state is measured")
+    parser.add_argument('--iterations', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    game = EscobaGame("bench-match", "alice", "bob")
+    for _ in range(args.moves):
+        game.play_card(game.current_player, random.choice(cards_of(game.hands[game.current_player])))
+    state = game.to_dict()
+    raw = json.dumps(state).encode()
+    fields = encode_fields(state)
+
+    print("Constructor only")
+    old = timed("redeal + overwrite", lambda: redeal_then_overwrite(state), args.iterations)
+    new = timed("EscobaGame.from_state", lambda: EscobaGame.from_state(state), args.iterations)
+    print(f"  speed-up x{old / new:.1f}")
+
+    print("Full load for a move (decode + constructor)")
+    old = timed("JSON record + redeal + overwrite", lambda: redeal_then_overwrite(json.loads(raw)), args.iterations)
+    new = timed("hash fields + from_state", lambda: EscobaGame.from_state(decode_fields(fields)), args.iterations)
+    print(f"  speed-up x{old / new:.1f}")
+
+if __name__ == '__main__':
+    main()
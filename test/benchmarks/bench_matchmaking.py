@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Matchmaking load benchmark
+Drives match-service/matchmaking.py against Redis directly (no HTTP, no player-service):
+many threads enqueue players with random levels, each join also tries to pair.
+Reports enqueues/sec, pairs made and how far apart paired levels were, then the
+join latency with a growing queue of players nobody can pair with, to show that
+pairing cost does not grow with the queue length.
+
+    python test/benchmarks/bench_matchmaking.py --redis-host localhost --players 20000 --threads 16
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'match-service'))
+
+from matchmaking import Matchmaker, QUEUE_KEY, JOINED_KEY  # noqa: E402
+
+def reset(client):
+    client.delete(QUEUE_KEY, JOINED_KEY)
+
+def enqueue_all(matchmaker, players, levels, threads):
+    pairs, lock = [], threading.Lock()
+
+    def worker(chunk):
+        for player in chunk:
+            _, opponent = matchmaker.join(player, levels[player])
+            if opponent:
+                with lock:
+                    pairs.append((player, opponent))
+
+    chunks = [players[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return pairs, time.perf_counter() - start
+
+def join_latency(matchmaker, client, queue_size, samples):
+    """Median/p99 join+pair time with queue_size players parked far from every sampled level"""
+    reset(client)
+    with client.pipeline(transaction=False) as pipe:
+        for i in range(queue_size):
+            pipe.zadd(QUEUE_KEY, {f"parked{i}": 1000 + (i % 1000) * 100})
+        pipe.execute()
+    timings = []
+    for i in range(samples):
+        start = time.perf_counter()
+        matchmaker.join(f"probe{i}", 1 if i % 2 else 50)
+        timings.append(time.perf_counter() - start)
+        matchmaker.leave(f"probe{i}")
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99) - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Matchmaking load benchmark")
+    parser.add_argument('--redis-host', default='localhost')
+    parser.add_argument('--redis-port', type=int, default=6379)
+    parser.add_argument('--db', type=int, default=15, help="Redis db to use (its matchmaking keys are wiped)")
+    parser.add_argument('--players', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--max-level', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    client = redis.Redis(host=args.redis_host, port=args.redis_port, db=args.db,
+                         max_connections=args.threads * 2)
+    matchmaker = Matchmaker(client, level_of=None)
+    rng = random.Random(args.seed)
+    players = [f"bench{i}" for i in range(args.players)]
+    levels = {player: rng.randint(1, args.max_level) for player in players}
+
+    reset(client)
+    pairs, elapsed = enqueue_all(matchmaker, players, levels, args.threads)
+    gaps = [abs(levels[a] - levels[b]) for a, b in pairs]
+    print(f"{args.players} players, {args.threads} threads, levels 1-{args.max_level}")
+    print(f"  enqueues/sec:   {args.players / elapsed:,.0f} ({elapsed:.2f}s)")
+    print(f"  pairs:          {len(pairs)} ({2 * len(pairs) / args.players:.1%} of players paired on join)")
+    print(f"  level gap:      avg {sum(gaps) / max(1, len(gaps)):.2f}, max {max(gaps, default=0)}")
+    print(f"  still waiting:  {client.zcard(QUEUE_KEY)}")
+
+    print("Join latency vs queue length")
+    for queue_size in (0, 1000, 10000, 100000):
+        median, p99 = join_latency(matchmaker, client, queue_size, samples=500)
+        print(f"  {queue_size:>7} queued   median {median * 1e6:7.1f} µs   p99 {p99 * 1e6:7.1f} µs")
+    reset(client)
+
+if __name__ == '__main__':
+    main()
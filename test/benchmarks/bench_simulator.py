@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Engine throughput benchmark
+Plays full games headless with match-service/simulator.py, first in-process and
+then over a process pool, and reports games/sec, moves/sec and scaling. Both runs
+use the same seed, so their results must match exactly: a mismatch means the
+engine is no longer deterministic for a given deal. --min-games-per-sec turns
+the in-process run into a regression gate (exit code 1 below the threshold).
+
+    python test/benchmarks/bench_simulator.py --games 20000 --workers 4
+    python test/benchmarks/bench_simulator.py --games 5000 --profile
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'match-service'))
+
+from simulator import simulate, print_report  # noqa: E402
+
+OUTCOME_KEYS = ("games", "moves", "wins", "draws", "escobas", "points")
+
+def main():
+    parser = argparse.ArgumentParser(description="Engine throughput benchmark")
+    parser.add_argument('--games', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--policies', nargs=2, default=['greedy', 'random'], metavar=('POLICY_A', 'POLICY_B'))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--profile', action='store_true', help="also print the allocation profile (separate, slower run)")
+    parser.add_argument('--min-games-per-sec', type=float, default=0, help="fail if the in-process run is slower")
+    args = parser.parse_args()
+
+    print("In-process")
+    single = simulate(args.games, args.policies, workers=1, seed=args.seed)
+    print_report(single)
+    print(f"Process pool ({args.workers} workers)")
+    pooled = simulate(args.games, args.policies, workers=args.workers, seed=args.seed)
+    print_report(pooled)
+    print(f"Scaling: x{pooled['games_per_sec'] / single['games_per_sec']:.2f} with {args.workers} workers")
+
+    if any(single[key] != pooled[key] for key in OUTCOME_KEYS):
+        print("❌ Same seed, different results: the engine is not deterministic")
+        sys.exit(1)
+
+    if args.profile:
+        print("Allocation profile")
+        print_report(simulate(min(args.games, 5000), args.policies, workers=1, seed=args.seed, profile=True))
+
+    if single['games_per_sec'] < args.min_games_per_sec:
+        print(f"❌ {single['games_per_sec']:.0f} games/sec is below {args.min_games_per_sec:.0f}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Match state encoding benchmark
+Compares the legacy single-key JSON match state with the state_codec hash layout:
+size in Redis, the full load/save path (decode + EscobaGame constructor, to_dict + encode),
+then what the hash layout reads and writes per request (player view, one move).
+
+    python test/benchmarks/bench_state_codec.py --moves 20 --iterations 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'match-service'))
+
+from engine import EscobaGame, match_view  # noqa: E402
+from rules import cards_of  # noqa: E402
+from state_codec import (  # noqa: E402
+    encode_fields, decode_fields, decode_moves, decode_public, decode_hand, encode_move,
+    PUBLIC_FIELD, hand_field,
+)
+
+def play_moves(game, moves, rng):
+    for _ in range(moves):
+        if game.status != "active":
+            break
+        player = game.current_player
+        game.play_card(player, rng.choice(cards_of(game.hands[player])))
+    return game
+
+def timed(label, fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed / iterations * 1e6:8.2f} µs/op")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Match state encoding benchmark")
+    parser.add_argument('--moves', type=int, default=20, help="moves played before the state is measured")
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    game = play_moves(EscobaGame("bench-match", "alice", "bob"), args.moves, rng)
+    state = game.to_dict()
+
+    json_raw = json.dumps(state).encode()
+    fields = encode_fields(state)
+    moves = b''.join(encode_move(m, game.players) for m in game.moves_log)
+    stored = decode_fields(fields)
+    stored['moves_log'] = decode_moves(moves, game.players)
+    assert stored == json.loads(json_raw)
+    hash_size = sum(len(field) + len(value) for field, value in fields.items()) + len(moves)
+
+    print(f"State after {len(game.moves_log)} moves")
+    print(f"  JSON: {len(json_raw):6d} bytes")
+    print(f"  hash: {hash_size:6d} bytes incl. field names and move list ({hash_size / len(json_raw):.0%} of JSON)")
+
+    print("Save (to_dict + encode)")
+    json_save = timed("json.dumps", lambda: json.dumps(game.to_dict()).encode(), args.iterations)
+    hash_save = timed("encode_fields + moves", lambda: (encode_fields(game.to_dict()),
+                                                        [encode_move(m, game.players) for m in game.moves_log]),
+                      args.iterations)
+    print("Load for a move (decode + constructor, no move log)")
+    json_load = timed("json.loads", lambda: EscobaGame.from_dict(json.loads(json_raw)), args.iterations)
+    hash_load = timed("decode_fields", lambda: EscobaGame.from_state(decode_fields(fields)), args.iterations)
+
+    print(f"Speed-up: save x{json_save / hash_save:.2f}, load x{json_load / hash_load:.2f}")
+
+    public, hand = fields[PUBLIC_FIELD], fields[hand_field("alice")]
+    move_record = encode_move(game.moves_log[-1], game.players) if game.moves_log else b''
+    print("Hash layout, per request")
+    print(f"  player view reads {len(public) + len(hand)} bytes, a move writes {len(public) + len(hand) + len(move_record)}"
+          f" bytes (JSON record: {len(json_raw)})")
+    full_view = timed("view from JSON record", lambda: EscobaGame.from_dict(json.loads(json_raw)).get_game_state("alice"),
+                      args.iterations)
+    field_view = timed("view from public + hand", lambda: match_view(decode_public(public), "alice", decode_hand(hand)),
+                       args.iterations)
+    print(f"Speed-up: view x{full_view / field_view:.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -41,12 +41,52 @@ def test_matches_service():
     assert "match_id" in data
     print("✅ Matches service passed")
 
+def get_token():
+    """Register a throwaway user and log in"""
+    username = f"gateway_{int(time.time() * 1000)}"
+    requests.post(f"{BASE_URL}/auth/register", json={"username": username, "password": "test1234"}, timeout=5)
+    response = requests.post(f"{BASE_URL}/auth/login", json={"username": username, "password": "test1234"}, timeout=5)
+    assert response.status_code == 200
+    return response.json()["token"]
+
+def test_upstream_connection_reuse():
+    """Test that repeated proxied calls reuse pooled upstream connections"""
+    print("🧪 Testing upstream connection pooling...")
+    headers = {"Authorization": f"Bearer {get_token()}"}
+    before = requests.get(f"{BASE_URL}/metrics", headers=headers, timeout=5).json()["upstreams"]["cards"]
+    # /cards/cards is answered by the gateway cache, /cards/health always reaches the upstream
+    calls = 5
+    for _ in range(calls):
+        requests.get(f"{BASE_URL}/cards/health", headers=headers, timeout=5)
+    response = requests.get(f"{BASE_URL}/metrics", headers=headers, timeout=5)
+    assert response.status_code == 200
+    after = response.json()["upstreams"]["cards"]
+    sent = after["requests"] - before["requests"]
+    # pool_misses counts real TCP connects: sequential calls must share a kept-alive socket
+    connects = after["pool_misses"] - before["pool_misses"]
+    assert sent >= calls
+    assert connects < sent
+    print("✅ Connection pooling passed")
+
+def test_cards_response_cache():
+    """Test that the card catalogue is cached and revalidated by the gateway"""
+    print("🧪 Testing card catalogue cache...")
+    first = requests.get(f"{BASE_URL}/cards/cards", timeout=5)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    second = requests.get(f"{BASE_URL}/cards/cards", headers={"If-None-Match": etag}, timeout=5)
+    assert second.status_code == 304
+    assert second.headers["X-Cache"] == "HIT"
+    print("✅ Card catalogue cache passed")
+
 def main():
     """Run all tests"""
     try:
         test_health_check()
         test_cards_service()
         test_matches_service()
+        test_upstream_connection_reuse()
+        test_cards_response_cache()
         print("🎉 All API Gateway tests passed!")
         return 0
     except Exception as e:
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Player stats concurrency test
+Fires parallel stats updates at one player straight at the player service
+(the gateway does not route PUT /players/<username>/stats) and checks that
+no increment was lost. Runs inside the api-gateway container, which reaches
+the player service through PLAYER_SERVICE_URL.
+"""
+
+import os
+import requests
+import time
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+PLAYER_SERVICE_URL = os.environ.get('PLAYER_SERVICE_URL', "http://player-service:5004")
+
+THREADS = 16
+WINS = 60
+LOSSES = 40
+DRAWS = 20
+SCORE_DELTA = 25
+
+def update(username, match_result):
+    response = requests.put(
+        f"{PLAYER_SERVICE_URL}/players/{username}/stats",
+        json={"match_result": match_result, "score_delta": SCORE_DELTA},
+        timeout=10
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["stats"]
+
+def test_parallel_stats_updates():
+    """Test that parallel updates to one player are all counted"""
+    print("🧪 Testing parallel stats updates...")
+    username = f"concurrency_{int(time.time())}"
+    results = ["win"] * WINS + ["loss"] * LOSSES + ["draw"] * DRAWS
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        responses = list(pool.map(lambda result: update(username, result), results))
+
+    # Every update saw a distinct row version
+    assert sorted(r["matches_played"] for r in responses) == list(range(1, len(results) + 1))
+
+    response = requests.get(f"{PLAYER_SERVICE_URL}/players/{username}/stats", timeout=5)
+    assert response.status_code == 200
+    stats = response.json()
+    total_score = len(results) * SCORE_DELTA
+    assert stats["matches_played"] == len(results)
+    assert stats["matches_won"] == WINS
+    assert stats["matches_lost"] == LOSSES
+    assert stats["total_score"] == total_score
+    assert stats["level"] == 1 + total_score // 1000
+    assert abs(stats["win_rate"] - WINS / len(results)) < 1e-4
+    print(f"✅ {len(results)} parallel updates counted: {stats}")
+
+def main():
+    """Run player stats concurrency test"""
+    try:
+        test_parallel_stats_updates()
+        return 0
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
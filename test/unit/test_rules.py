@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+La Escoba rules unit tests
+Checks the 40-bit mask rules in match-service/rules.py (capture enumeration,
+escoba detection, automatic capture choice) against a plain list-based
+reference implementation. Pure Python: no Redis, no HTTP.
+
+    python -m pytest -q test/unit
+"""
+
+import itertools
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'match-service'))
+
+from engine import EscobaGame  # noqa: E402
+from rules import (  # noqa: E402
+    CARD_POINTS, best_capture, capture_options, capture_value, cards_of, is_escoba, mask_of, move_hints,
+    subsets_by_sum,
+)
+
+# --- List-based reference ---
+
+def reference_points(card_id):
+    """Same as cards-service "points": 1-7 face value, Sota 8, Caballo 9, Rey 10"""
+    return (card_id - 1) % 10 + 1
+
+def reference_captures(card_id, table_cards):
+    """Every combination of table cards that makes 15 with the played card"""
+    needed = 15 - reference_points(card_id)
+    return {
+        frozenset(combo)
+        for size in range(1, len(table_cards) + 1)
+        for combo in itertools.combinations(table_cards, size)
+        if sum(reference_points(c) for c in combo) == needed
+    }
+
+def reference_value(capture, table_cards):
+    """capture_value on lists: escoba, 7 de Oros, most cards, most oros"""
+    return (
+        bool(capture) and set(capture) == set(table_cards),
+        7 in capture,
+        len(capture),
+        sum(1 for c in capture if c <= 10),
+    )
+
+def options_as_sets(card_id, table_cards):
+    return {frozenset(cards_of(option)) for option in capture_options(card_id, mask_of(table_cards))}
+
+# --- Tests ---
+
+def test_card_points_match_reference():
+    assert [CARD_POINTS[c] for c in range(1, 41)] == [reference_points(c) for c in range(1, 41)]
+
+def test_masks_round_trip():
+    cards = [1, 7, 10, 21, 40]
+    assert cards_of(mask_of(cards)) == cards
+    assert mask_of([]) == 0 and cards_of(0) == []
+
+def test_single_capture():
+    # 5 de Espadas (5) takes the Rey de Oros (10)
+    assert options_as_sets(25, [10, 3]) == {frozenset([10])}
+
+def test_several_captures_summing_to_15():
+    # 5 de Espadas (5) needs 10: the Rey de Oros alone, or 1 + 4 + 5
+    table = [1, 4, 15, 10]
+    assert options_as_sets(25, table) == {frozenset([10]), frozenset([1, 4, 15])}
+    hints = {hint["card_id"]: hint for hint in move_hints(mask_of([25]), mask_of(table))}
+    assert sorted(sorted(c["cards"]) for c in hints[25]["captures"]) == [[1, 4, 15], [10]]
+
+def test_no_capture_lays_the_card_down():
+    assert capture_options(1, mask_of([2, 3])) == ()
+    assert best_capture(1, mask_of([2, 3])) == 0
+
+def test_sums_outside_5_to_14_are_not_listed():
+    sums = subsets_by_sum(mask_of([10, 20, 30, 1]))
+    assert all(5 <= total <= 14 for total in sums)
+    assert 20 not in sums and 30 not in sums
+
+def test_escoba_detection():
+    table = mask_of([3, 12])  # 3 + 2
+    capture = best_capture(20, table)  # Rey de Copas (10) clears the table
+    assert cards_of(capture) == [3, 12]
+    assert is_escoba(capture, table)
+    assert not is_escoba(mask_of([3]), table)
+    assert not is_escoba(0, 0)
+
+def test_escoba_is_counted_by_the_engine():
+    game = EscobaGame("m1", "a", "b", rng=random.Random(1))
+    game.hands = {"a": mask_of([20, 5]), "b": mask_of([6])}
+    game.table = mask_of([3, 12])
+    ok, result = game.play_card("a", 20)
+    assert ok and result == "escoba"
+    assert game.escobas["a"] == 1 and game.table == 0
+    assert cards_of(game.captured["a"]) == [3, 12, 20]
+
+def test_auto_capture_prefers_seven_of_oros_then_most_cards():
+    # 1 de Bastos (1) needs 14: 7 + 7, or 2 + 3 + 4 + 5
+    assert cards_of(best_capture(31, mask_of([27, 37, 22, 23, 24, 35]))) == [22, 23, 24, 35]
+    # With the 7 de Oros on the table the pair that takes it wins over the four cards
+    assert 7 in cards_of(best_capture(31, mask_of([7, 37, 22, 23, 24, 35])))
+    # Clearing the table always wins
+    table = mask_of([4, 10])
+    assert is_escoba(best_capture(31, table), table)
+
+def test_invalid_capture_is_rejected():
+    game = EscobaGame("m1", "a", "b", rng=random.Random(1))
+    game.hands = {"a": mask_of([25]), "b": mask_of([6])}
+    game.table = mask_of([1, 4, 15, 10])
+    assert game.play_card("a", 25, capture=[1, 4]) == (False, "Invalid capture")
+    ok, result = game.play_card("a", 25, capture=[1, 4, 15])
+    assert ok and result == "capture"
+    assert cards_of(game.table) == [10]
+
+def test_random_positions_match_reference():
+    rng = random.Random(2024)
+    for _ in range(3000):
+        cards = rng.sample(range(1, 41), rng.randint(1, 13))
+        card_id, table = cards[0], cards[1:]
+        assert options_as_sets(card_id, table) == reference_captures(card_id, table), (card_id, table)
+
+        best = best_capture(card_id, mask_of(table))
+        expected = reference_captures(card_id, table)
+        if not expected:
+            assert best == 0
+            continue
+        # Equal-valued options may be picked in a different order, so compare the value
+        assert capture_value(best, mask_of(table)) == max(reference_value(c, table) for c in expected)
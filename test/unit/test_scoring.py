@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+La Escoba scoring unit tests
+Checks the numpy scorer in match-service/scoring.py against a plain Python
+reference scorer on hand-built ties and random finished games, and the
+input checks of POST /match/score. No Redis, no HTTP server.
+
+    python -m pytest -q test/unit
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'match-service'))
+
+from rules import mask_of  # noqa: E402
+from scoring import score_batch, score_game, winner  # noqa: E402
+
+# --- Reference scorer ---
+
+# Primera value by rank 1..10 (1-7, Sota, Caballo, Rey)
+REFERENCE_PRIMERA = {1: 16, 2: 12, 3: 13, 4: 14, 5: 15, 6: 18, 7: 21, 8: 10, 9: 10, 10: 10}
+
+def reference_primera(pile):
+    best = {}
+    for card in pile:
+        suit, rank = (card - 1) // 10, (card - 1) % 10 + 1
+        best[suit] = max(best.get(suit, 0), REFERENCE_PRIMERA[rank])
+    return sum(best.values())
+
+def reference_score(pile1, pile2, escobas1, escobas2):
+    def most(a, b):
+        return (int(a > b), int(b > a))
+    cards = most(len(pile1), len(pile2))
+    oros = most(sum(c <= 10 for c in pile1), sum(c <= 10 for c in pile2))
+    primera = most(reference_primera(pile1), reference_primera(pile2))
+    seven = (int(7 in pile1), int(7 in pile2))
+    return tuple(cards[i] + oros[i] + primera[i] + seven[i] + (escobas1, escobas2)[i] for i in range(2))
+
+def split_deck(rng):
+    deck = list(range(1, 41))
+    rng.shuffle(deck)
+    cut = rng.randint(0, 40)
+    return sorted(deck[:cut]), sorted(deck[cut:])
+
+# --- Tests ---
+
+def test_primera_tie_gives_nobody_the_point():
+    # Two 7s (21) and two 6s (18) on each side: 78 against 78
+    scores, details = score_game(["a", "b"], {"a": [7, 17, 26, 36], "b": [27, 37, 16, 6]}, {})
+    assert details["a"]["primera"] == 0 and details["b"]["primera"] == 0
+    assert details["a"]["seven_of_oros"] == 1
+    assert scores == {"a": 1, "b": 0}  # only the 7 de Oros: cards and oros are tied too
+
+def test_primera_counts_best_card_per_suit():
+    # a: 7 Oros (21) + Rey Copas (10) = 31, b: 6 Oros (18) + 6 Copas (18) = 36
+    _, details = score_game(["a", "b"], {"a": [7, 20], "b": [6, 16]}, {})
+    assert details["b"]["primera"] == 1 and details["a"]["primera"] == 0
+
+def test_oros_split_gives_nobody_the_point():
+    pile_a = list(range(1, 6)) + list(range(11, 21))
+    pile_b = list(range(6, 11)) + list(range(21, 41))
+    _, details = score_game(["a", "b"], {"a": pile_a, "b": pile_b}, {})
+    assert details["a"]["oros"] == 0 and details["b"]["oros"] == 0
+    assert details["b"]["cards"] == 1
+
+def test_card_count_tie_gives_nobody_the_point():
+    _, details = score_game(["a", "b"], {"a": list(range(1, 41, 2)), "b": list(range(2, 41, 2))}, {})
+    assert details["a"]["cards"] == 0 and details["b"]["cards"] == 0
+
+def test_escobas_add_one_point_each():
+    scores, details = score_game(["a", "b"], {"a": [], "b": []}, {"a": 3, "b": 1})
+    assert scores == {"a": 3, "b": 1}
+    assert details["a"]["escobas"] == 3
+    assert winner(["a", "b"], scores) == "a"
+    assert winner(["a", "b"], {"a": 2, "b": 2}) == "draw"
+
+def test_masks_and_lists_score_the_same():
+    rng = random.Random(7)
+    games = [split_deck(rng) for _ in range(50)]
+    escobas = [(rng.randint(0, 3), rng.randint(0, 3)) for _ in games]
+    as_lists, _ = score_batch(games, escobas)
+    as_masks, _ = score_batch([(mask_of(a), mask_of(b)) for a, b in games], escobas)
+    assert (as_lists == as_masks).all()
+
+def test_random_games_match_reference():
+    rng = random.Random(2024)
+    games = [split_deck(rng) for _ in range(2000)]
+    escobas = [(rng.randint(0, 4), rng.randint(0, 4)) for _ in games]
+    points, _ = score_batch(games, escobas)
+    for i, ((pile1, pile2), (e1, e2)) in enumerate(zip(games, escobas)):
+        assert tuple(int(p) for p in points[i]) == reference_score(pile1, pile2, e1, e2), (pile1, pile2)
+
+# --- POST /match/score ---
+
+def score_request(captured):
+    from app import app  # Flask and a lazy Redis client: no connection is made for this route
+    body = {"games": [{"players": ["a", "b"], "captured": captured, "escobas": {"a": 1}}]}
+    return app.test_client().post('/match/score', json=body)
+
+def test_score_endpoint_rejects_masks_and_bad_ids():
+    assert score_request({"a": 99, "b": []}).status_code == 400
+    assert score_request({"a": [0], "b": []}).status_code == 400
+    assert score_request({"a": [41], "b": []}).status_code == 400
+    assert score_request({"a": [True], "b": []}).status_code == 400
+
+def test_score_endpoint_scores_card_lists():
+    response = score_request({"a": [7, 1, 2], "b": [11]})
+    assert response.status_code == 200
+    result = response.get_json()["results"][0]
+    assert result["scores"] == {"a": 5, "b": 0}
+    assert result["winner"] == "a"